@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 from typing import Dict, Any
 
@@ -33,7 +33,7 @@ except ImportError as e:
     
     @router.get("/error")
     async def get_import_error():
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"message": "API routes not properly configured"}
         ) 
\ No newline at end of file
@@ -1,21 +1,121 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
 from datetime import datetime
 from .config import settings
+from .response_cache import response_cache
+from .faq import faq_router
+from .batching import MicroBatcher, TokenBucket
 import logging
-import json
+import asyncio
+import re
+import orjson
 import httpx
+import numpy as np
 from typing import Union
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 logger = logging.getLogger(__name__)
 
+# Hugging Face answers 429 when rate limited and 503 while the model is loading
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Numbered step lines ("1." to "9."), returned without surrounding whitespace
+STEP_RE = re.compile(r'^[^\S\n]*([1-9]\.[^\n]*?)[^\S\n]*$', re.M)
+# Above this size, numbered steps are located with a vectorized byte scan
+VECTORIZED_STEP_SCAN_MIN_CHARS = 10_000
+# Contents of closed ``` fenced blocks
+CODE_RE = re.compile(r'^[^\S\n]*```[^\n]*\n(.*?)\n?^[^\S\n]*```', re.M | re.S)
+# A line mentioning verification/testing plus the non-blank lines that follow it
+VERIFICATION_RE = re.compile(r'^[^\n]*(?:verif|test)[^\n]*(?:\n[^\S\n]*\S[^\n]*)*', re.M | re.I)
+
+# Topics that always need a human to review the answer
+HUMAN_FLAG_RE = re.compile(r'security|compliance|legal|hardware', re.I)
+
+# Instruction prompt; only the head is formatted per request
+PROMPT_HEAD = (
+    "Given the technical issue: {query}\n"
+    "User skill level: {skill}\n"
+    "Context: {context}\n"
+)
+PROMPT_INSTRUCTIONS = (
+    "\n"
+    "Provide a detailed solution with:\n"
+    "1. Root cause analysis\n"
+    "2. Step-by-step resolution steps\n"
+    "3. Code examples if relevant\n"
+    "4. Verification steps\n"
+    "5. Preventive measures\n"
+)
+
+def _extract_steps_vectorized(response: str) -> List[str]:
+    """Find numbered step lines with numpy over the UTF-8 bytes of ``response``.
+
+    Matches the same lines as STEP_RE: a digit 1-9 followed by "." with only
+    whitespace before it on the line.
+    """
+    raw = response.encode()
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    if buf.size < 2:
+        return []
+
+    # Positions of a step marker: a digit 1-9 immediately followed by "."
+    markers = np.flatnonzero((buf[:-1] >= 0x31) & (buf[:-1] <= 0x39) & (buf[1:] == 0x2E))
+    if not markers.size:
+        return []
+
+    newlines = np.flatnonzero(buf == 0x0A)
+    line_numbers = np.searchsorted(newlines, markers)
+    line_starts = np.concatenate(([0], newlines + 1))[line_numbers]
+    line_ends = np.append(newlines, buf.size)[line_numbers]
+
+    steps = []
+    last_line = -1
+    for marker, line, start, end in zip(markers.tolist(), line_numbers.tolist(), line_starts.tolist(), line_ends.tolist()):
+        # Decoded so Unicode spaces count as indentation, as they do for STEP_RE's [^\S\n]
+        if line == last_line or (marker > start and not raw[start:marker].decode().isspace()):
+            continue
+        steps.append(raw[start:end].decode().strip())
+        last_line = line
+    return steps
+
+class RetryableAPIError(Exception):
+    """Raised for Hugging Face API responses that are worth retrying"""
+
 class AIEngine:
     def __init__(self):
         """Initialize the AI Engine with Hugging Face API configuration"""
         try:
             self.api_url = "https://api-inference.huggingface.co/models/"
-            self.headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
-            self.model_name = settings.AI_MODEL_NAME
-            self.client = None
+            self.headers = {
+                "Authorization": f"Bearer {settings.get_huggingface_api_key()}",
+                "Content-Type": "application/json"
+            }
+            self.model_name = settings.HUGGINGFACE_MODEL
+            self.endpoint = self.api_url + self.model_name
+            # One pooled client shared app-wide; closed on application shutdown
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(settings.REQUEST_TIMEOUT, connect=5.0),
+                # Pool settings belong on the transport: the client ignores its own
+                # limits/http2 arguments whenever a transport is passed
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    retries=3,
+                    limits=httpx.Limits(
+                        max_connections=200,
+                        max_keepalive_connections=100,
+                        keepalive_expiry=60
+                    )
+                )
+            )
+            # Concurrent queries are coalesced into batched inference requests issued
+            # by a single model worker, optionally paced to HF_QPS_LIMIT
+            self.batcher = MicroBatcher(
+                self._generate_batch,
+                max_batch_size=settings.HF_BATCH_MAX_SIZE,
+                max_wait_ms=settings.HF_BATCH_WAIT_MS,
+                max_concurrency=settings.HF_MAX_CONCURRENT_BATCHES,
+                rate_limiter=TokenBucket(settings.HF_QPS_LIMIT) if settings.HF_QPS_LIMIT > 0 else None
+            )
             self.is_initialized = bool(settings.HUGGINGFACE_API_KEY)
             if not self.is_initialized:
                 logger.warning("HUGGINGFACE_API_KEY not set. AI Engine will not be operational.")
@@ -27,14 +127,22 @@ class AIEngine:
             raise
 
     async def get_client(self) -> httpx.AsyncClient:
-        """Get or create httpx client"""
-        if self.client is None:
-            self.client = httpx.AsyncClient(
-                headers=self.headers,
-                timeout=settings.REQUEST_TIMEOUT
-            )
+        """Get the shared httpx client"""
         return self.client
 
+    @retry(
+        retry=retry_if_exception_type((RetryableAPIError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8),
+        stop=stop_after_attempt(4),
+        reraise=True
+    )
+    async def _post(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST to the Hugging Face API, backing off on rate limits and server errors"""
+        response = await self.client.post(url, content=orjson.dumps(payload))
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableAPIError(f"API request failed with status {response.status_code}: {response.text}")
+        return response
+
     async def process_query(
         self,
         query: str,
@@ -43,6 +151,11 @@ class AIEngine:
         language: str = "en"
     ) -> Dict[str, Any]:
         """Process user query with context-aware AI response"""
+        # Known FAQs are answered directly without touching the cache or the model
+        faq_answer = faq_router.match(query)
+        if faq_answer:
+            return faq_answer
+
         if not self.is_initialized:
             return {
                 "error": "AI Engine not initialized",
@@ -52,6 +165,11 @@ class AIEngine:
             }
 
         try:
+            # Serve repeated or near-duplicate questions from the cache
+            cached = await response_cache.get(query, context, user_skill_level, language)
+            if cached:
+                return {**cached, "cached": True}
+
             # Generate solution
             solution = await self.generate_solution(
                 query=query,
@@ -63,12 +181,14 @@ class AIEngine:
             # Calculate confidence
             confidence_score = self.calculate_confidence(solution)
             
-            return {
+            result = {
                 "solution": solution,
                 "needs_human": self.check_needs_human(solution),
                 "confidence_score": confidence_score,
                 "timestamp": datetime.utcnow().isoformat()
             }
+            await response_cache.set(query, context, user_skill_level, language, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
@@ -79,6 +199,22 @@ class AIEngine:
                 "confidence_score": 0.0
             }
 
+    async def process_queries_batch(
+        self,
+        queries: List[str],
+        context: Dict[str, Any],
+        user_skill_level: str = "beginner",
+        language: str = "en"
+    ) -> List[Dict[str, Any]]:
+        """Process many queries concurrently, at most HF_MAX_CONCURRENCY at a time"""
+        semaphore = asyncio.Semaphore(settings.HF_MAX_CONCURRENCY)
+
+        async def process_one(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.process_query(query, context, user_skill_level, language)
+
+        return await asyncio.gather(*(process_one(query) for query in queries))
+
     async def generate_solution(
         self,
         query: str,
@@ -88,53 +224,150 @@ class AIEngine:
     ) -> Dict[str, Any]:
         """Generate comprehensive solution using Hugging Face API"""
         try:
-            # Prepare prompt
-            prompt = f"""
-            Given the technical issue: {query}
-            User skill level: {user_skill_level}
-            Context: {json.dumps(context)}
-            
-            Provide a detailed solution with:
-            1. Root cause analysis
-            2. Step-by-step resolution steps
-            3. Code examples if relevant
-            4. Verification steps
-            5. Preventive measures
-            """
-            
-            # Make API request to Hugging Face
-            client = await self.get_client()
-            response = await client.post(
-                f"{self.api_url}{self.model_name}",
-                json={"inputs": prompt}
-            )
+            prompt = self._build_prompt(query, context, user_skill_level)
             
-            if response.status_code != 200:
-                raise Exception(f"API request failed: {response.text}")
+            # Queue the prompt for the next batched API request to Hugging Face
+            generated_text = await self.batcher.submit(prompt)
             
-            result = response.json()
-            generated_text = result[0]["generated_text"]
-            
-            return {
-                "response": generated_text,
-                "steps": self.extract_steps(generated_text),
-                "code_samples": self.extract_code_samples(generated_text),
-                "verification": self.extract_verification_steps(generated_text)
-            }
+            return self._build_solution(generated_text)
             
         except Exception as e:
             logger.error(f"Error generating solution: {str(e)}")
             raise
 
+    async def stream_solution(
+        self,
+        query: str,
+        context: Dict[str, Any],
+        user_skill_level: str = "beginner",
+        language: str = "en"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a solution from the Hugging Face API as it is generated.
+
+        Yields ``token`` events as text arrives, ``step`` events as soon as a
+        numbered step line is complete, and a final ``done`` event carrying the
+        same payload as process_query. FAQ and cache hits are answered with the
+        ``done`` event alone.
+        """
+        faq_answer = faq_router.match(query)
+        if faq_answer:
+            yield {"type": "done", **faq_answer}
+            return
+
+        if not self.is_initialized:
+            yield {
+                "type": "error",
+                "error": "AI Engine not initialized",
+                "details": "HUGGINGFACE_API_KEY not set"
+            }
+            return
+
+        buffer = ""
+        scanned = 0
+        try:
+            cached = await response_cache.get(query, context, user_skill_level, language)
+            if cached:
+                yield {"type": "done", **cached, "cached": True}
+                return
+
+            prompt = self._build_prompt(query, context, user_skill_level)
+            # Streams can't be batched, but they count against the same HF concurrency and QPS limits
+            async with self.batcher.capacity(), self.client.stream(
+                "POST",
+                self.endpoint,
+                content=orjson.dumps({"inputs": prompt, "stream": True})
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise Exception(f"API request failed: {response.text}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = orjson.loads(line[5:])
+                    token = event.get("token", {})
+                    if token.get("special"):
+                        continue
+                    text = token.get("text", "")
+                    if not text:
+                        continue
+
+                    buffer += text
+                    yield {"type": "token", "text": text}
+
+                    # Emit steps for lines that have been completed since the last scan
+                    last_newline = buffer.rfind("\n")
+                    if last_newline >= scanned:
+                        for step in STEP_RE.findall(buffer, scanned, last_newline):
+                            yield {"type": "step", "text": step}
+                        scanned = last_newline + 1
+
+            for step in STEP_RE.findall(buffer, scanned):
+                yield {"type": "step", "text": step}
+
+            solution = self._build_solution(buffer)
+            result = {
+                "solution": solution,
+                "needs_human": self.check_needs_human(solution),
+                "confidence_score": self.calculate_confidence(solution),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            yield {"type": "done", **result}
+            await response_cache.set(query, context, user_skill_level, language, result)
+
+        except Exception as e:
+            logger.error(f"Error streaming solution: {str(e)}")
+            yield {
+                "type": "error",
+                "error": "Failed to process query",
+                "details": str(e)
+            }
+
+    def _build_prompt(self, query: str, context: Dict[str, Any], user_skill_level: str) -> str:
+        """Build the instruction prompt sent to the model"""
+        return PROMPT_HEAD.format_map({
+            "query": query,
+            "skill": user_skill_level,
+            "context": orjson.dumps(context).decode()
+        }) + PROMPT_INSTRUCTIONS
+
+    def _build_solution(self, generated_text: str) -> Dict[str, Any]:
+        """Split generated text into the structured solution payload"""
+        return {
+            "response": generated_text,
+            "steps": self.extract_steps(generated_text),
+            "code_samples": self.extract_code_samples(generated_text),
+            "verification": self.extract_verification_steps(generated_text)
+        }
+
+    async def _generate_batch(self, prompts: List[str]) -> List[Union[str, Exception]]:
+        """Run a batch of prompts through the Hugging Face API in one request"""
+        response = await self._post(
+            self.endpoint,
+            {"inputs": prompts}
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"API request failed: {response.text}")
+        
+        results = orjson.loads(response.content)
+        generated = []
+        for item in results:
+            # Batched text-generation responses nest one candidate list per input
+            if isinstance(item, list):
+                item = item[0] if item else {}
+            if isinstance(item, dict) and "generated_text" in item:
+                generated.append(item["generated_text"])
+            else:
+                generated.append(Exception(f"Unexpected API response item: {item}"))
+        return generated
+
     def check_needs_human(self, solution: Dict[str, Any]) -> bool:
         """Determine if human intervention is needed"""
         try:
             return (
                 solution.get("confidence_score", 1.0) < 0.7 or
-                any(
-                    flag in str(solution.get("response", "")).lower()
-                    for flag in ["security", "compliance", "legal", "hardware"]
-                )
+                HUMAN_FLAG_RE.search(str(solution.get("response") or "")) is not None
             )
         except Exception as e:
             logger.error(f"Error checking human need: {str(e)}")
@@ -171,11 +404,9 @@ class AIEngine:
     def extract_steps(self, response: str) -> List[str]:
         """Extract step-by-step instructions from response"""
         try:
-            steps = []
-            for line in response.split("\n"):
-                if any(line.strip().startswith(str(i) + ".") for i in range(1, 10)):
-                    steps.append(line.strip())
-            return steps
+            if len(response) >= VECTORIZED_STEP_SCAN_MIN_CHARS:
+                return _extract_steps_vectorized(response)
+            return STEP_RE.findall(response)
         except Exception as e:
             logger.error(f"Error extracting steps: {str(e)}")
             return []
@@ -183,20 +414,7 @@ class AIEngine:
     def extract_code_samples(self, response: str) -> List[str]:
         """Extract code samples from response"""
         try:
-            code_samples = []
-            in_code_block = False
-            current_block = []
-            
-            for line in response.split("\n"):
-                if line.strip().startswith("```"):
-                    if in_code_block:
-                        code_samples.append("\n".join(current_block))
-                        current_block = []
-                    in_code_block = not in_code_block
-                elif in_code_block:
-                    current_block.append(line)
-                    
-            return code_samples
+            return CODE_RE.findall(response)
         except Exception as e:
             logger.error(f"Error extracting code samples: {str(e)}")
             return []
@@ -204,18 +422,11 @@ class AIEngine:
     def extract_verification_steps(self, response: str) -> List[str]:
         """Extract verification steps from response"""
         try:
-            verification_steps = []
-            in_verification = False
-            
-            for line in response.split("\n"):
-                if "verif" in line.lower() or "test" in line.lower():
-                    in_verification = True
-                if in_verification and line.strip():
-                    verification_steps.append(line.strip())
-                if in_verification and not line.strip():
-                    in_verification = False
-                    
-            return verification_steps
+            return [
+                line.strip()
+                for block in VERIFICATION_RE.findall(response)
+                for line in block.split("\n")
+            ]
         except Exception as e:
             logger.error(f"Error extracting verification steps: {str(e)}")
             return []
@@ -225,5 +436,23 @@ class AIEngine:
         if self.client:
             await self.client.aclose()
 
-# Initialize singleton instance
-ai_engine = AIEngine()
\ No newline at end of file
+# Shared instance, created on first use so importing this module stays cheap
+_ai_engine: Optional[AIEngine] = None
+
+async def get_ai_engine() -> AIEngine:
+    """Get the shared AIEngine, creating it on first use.
+
+    A coroutine so FastAPI runs it on the event loop: as a plain ``def`` dependency
+    it would run in the threadpool, where concurrent first requests could each
+    build an engine (and leak its client and batcher).
+    """
+    global _ai_engine
+    if _ai_engine is None:
+        _ai_engine = AIEngine()
+    return _ai_engine
+
+async def shutdown_ai_engine() -> None:
+    """Stop the shared AIEngine if it was ever created"""
+    if _ai_engine is not None:
+        await _ai_engine.batcher.stop()
+        await _ai_engine.close()
\ No newline at end of file
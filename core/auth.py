@@ -1,37 +1,71 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import jwt
+import bcrypt
 from core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Password hashing configuration
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    default="bcrypt",
-    bcrypt__default_rounds=12,
-    deprecated="auto"
-)
+BCRYPT_ROUNDS = 12
+
+# bcrypt releases the GIL while hashing, so worker threads keep it off the event loop
+_bcrypt_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bcrypt")
 
 # JWT settings
 SECRET_KEY = settings.SECRET_KEY
+SECRET_KEY_BYTES = SECRET_KEY.encode()
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Recently verified (password digest, hash) pairs so repeat logins skip bcrypt.
+# Only a keyed BLAKE2b digest of the password is kept, never the password itself.
+VERIFY_CACHE_SIZE = 4096
+_verified_passwords: "OrderedDict[tuple, None]" = OrderedDict()
+
+def _password_digest(plain_password: str) -> bytes:
+    """Keyed digest of a password used as verification cache key."""
+    return hashlib.blake2b(
+        plain_password.encode(),
+        key=SECRET_KEY_BYTES[:64],
+        digest_size=16
+    ).digest()
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify hashed password."""
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        cache_key = (_password_digest(plain_password), hashed_password)
+        if cache_key in _verified_passwords:
+            _verified_passwords.move_to_end(cache_key)
+            return True
+
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(
+            _bcrypt_pool, bcrypt.checkpw, plain_password.encode(), hashed_password.encode()
+        ):
+            return False
+
+        _verified_passwords[cache_key] = None
+        if len(_verified_passwords) > VERIFY_CACHE_SIZE:
+            _verified_passwords.popitem(last=False)
+        return True
     except Exception as e:
         logger.error(f"Password verification failed: {str(e)}")
         return False
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash password."""
     try:
-        return pwd_context.hash(password)
+        loop = asyncio.get_running_loop()
+        hashed = await loop.run_in_executor(
+            _bcrypt_pool, bcrypt.hashpw, password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+        )
+        return hashed.decode()
     except Exception as e:
         logger.error(f"Password hashing failed: {str(e)}")
         raise
@@ -42,7 +76,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        return jwt.encode(to_encode, SECRET_KEY_BYTES, algorithm=ALGORITHM)
     except Exception as e:
         logger.error(f"Error creating access token: {str(e)}")
         raise
@@ -50,8 +84,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 def decode_token(token: str) -> Optional[dict]:
     """Decode JWT token and return payload."""
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError as e:
+        return jwt.decode(token, SECRET_KEY_BYTES, algorithms=[ALGORITHM])
+    except jwt.PyJWTError as e:
         logger.error(f"Failed to decode JWT token: {str(e)}")
         return None
     except Exception as e:
@@ -0,0 +1,192 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` operations per second on average"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AdaptiveLimiter:
+    """Async concurrency limit tuned by AIMD, like TCP congestion control.
+
+    Each successful call grows the limit by ``1 / limit`` (about +1 per full
+    window); a call failing with an exception for which ``is_overload`` returns
+    true (e.g. HTTP 429/5xx) multiplies it by ``backoff``. The limit stays within
+    ``[min_limit, max_limit]``. Other exceptions leave the limit unchanged and
+    all exceptions propagate to the caller.
+    """
+
+    def __init__(
+        self,
+        is_overload: Callable[[Exception], bool],
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 50,
+        backoff: float = 0.5
+    ):
+        self.is_overload = is_overload
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a free slot, then adjust the limit by the outcome of the guarded call"""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        except Exception as e:
+            if self.is_overload(e):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                logger.warning(f"Overload signalled, concurrency limit now {int(self.limit)}")
+            raise
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+class MicroBatcher:
+    """Coalesce concurrent calls into batches handled by a single background worker.
+
+    Callers ``submit`` one item and await its result. The worker collects up to
+    ``max_batch_size`` items, waiting at most ``max_wait_ms`` after the first one,
+    and passes them to ``handler`` which must return one result per item (an
+    ``Exception`` instance fails only that caller). ``max_concurrency`` bounds
+    how many batches are in flight at once (1 serializes them, 0 means no
+    limit) and ``rate_limiter`` paces how often a batch may be dispatched.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10,
+        max_concurrency: int = 0,
+        rate_limiter: Optional[TokenBucket] = None
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.rate_limiter = rate_limiter
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.pending: set = set()
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop"""
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker and fail any requests still waiting in the queue"""
+        if self.worker:
+            self.worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.worker
+            self.worker = None
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+        while self.queue and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        if self.worker is None or self.worker.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    @contextlib.asynccontextmanager
+    async def capacity(self) -> AsyncIterator[None]:
+        """Hold one dispatch slot, paced by the rate limiter, for a call made outside the queue.
+
+        Requests that can't be batched (e.g. streamed ones) share the same
+        ``max_concurrency`` and ``rate_limiter`` budget as the batches.
+        """
+        if self.slots:
+            await self.slots.acquire()
+        try:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            yield
+        finally:
+            if self.slots:
+                self.slots.release()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Waiting here lets the queue keep filling, so the next batch is larger
+            if self.slots:
+                await self.slots.acquire()
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} failed: {str(e)}")
+            results = [e] * len(batch)
+        finally:
+            if self.slots:
+                self.slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,61 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """CLOSED/OPEN/HALF_OPEN circuit breaker for an unreliable dependency.
+
+    After ``failure_threshold`` failures with no success in between (and none
+    more than ``recovery_timeout`` seconds apart) the circuit opens and
+    ``allow_request`` rejects callers until ``recovery_timeout`` seconds have
+    passed. A single probe is then let through (HALF_OPEN); its outcome either
+    closes the circuit again or restarts the cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_failure_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Whether a call to the dependency may be attempted now"""
+        if self.state == self.CLOSED:
+            return True
+        # A probe that never reported back (e.g. cancelled) is replaced after another cooldown
+        now = time.monotonic()
+        if now - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+            logger.info(f"Circuit '{self.name}' half-open, probing")
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call"""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit when the threshold is reached"""
+        # Sporadic errors spread over a long period don't add up to an outage
+        now = time.monotonic()
+        if now - self.last_failure_at > self.recovery_timeout:
+            self.failures = 0
+        self.last_failure_at = now
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit '{self.name}' open for {self.recovery_timeout}s after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = now
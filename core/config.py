@@ -26,17 +26,31 @@ class Settings(BaseSettings):
     # MongoDB Settings
     MONGODB_URL: str = Field(env='MONGODB_URL', default='mongodb://localhost:27017')
     MONGODB_DB_NAME: str = Field(env='MONGODB_DB_NAME', default='fastapi_db')
+    # Server-side connections ~= (MONGODB_MIN_POOL_SIZE + 2) x replica set members x app instances
+    # (the +2 covers each member's monitoring connections); size mongod/Atlas tiers accordingly
+    MONGODB_MAX_POOL_SIZE: int = Field(env='MONGODB_MAX_POOL_SIZE', default=100)
+    MONGODB_MIN_POOL_SIZE: int = Field(env='MONGODB_MIN_POOL_SIZE', default=10)
+    # Extra Motor client options; pool sizes are taken from the two settings above only
     MONGODB_OPTIONS: Dict[str, Any] = Field(
         default_factory=lambda: {
-            "maxPoolSize": 100,
-            "minPoolSize": 10,
-            "maxIdleTimeMS": 30000,
+            "maxIdleTimeMS": 300000,
+            "waitQueueTimeoutMS": 5000,
+            "heartbeatFrequencyMS": 30000,
+            "compressors": "zstd,zlib",
+            "zlibCompressionLevel": -1,
             "connectTimeoutMS": 20000,
             "serverSelectionTimeoutMS": 20000,
             "retryWrites": True,
             "w": "majority"
         }
     )
+    # initialize() retries with full-jitter backoff: uniform(0, min(max, base * 2**attempt))
+    MONGODB_INIT_RETRIES: int = Field(env='MONGODB_INIT_RETRIES', default=4)
+    MONGODB_RETRY_BASE_DELAY: float = Field(env='MONGODB_RETRY_BASE_DELAY', default=0.1)
+    MONGODB_RETRY_MAX_DELAY: float = Field(env='MONGODB_RETRY_MAX_DELAY', default=2.0)
+    AUTO_CREATE_INDEXES: bool = Field(env='AUTO_CREATE_INDEXES', default=True)
+    DB_CONCURRENCY_LIMIT: int = Field(env='DB_CONCURRENCY_LIMIT', default=64)
+    MONGODB_APP_NAME: str = Field(env='MONGODB_APP_NAME', default='ai-help-center')
     
     # JWT Settings
     SECRET_KEY: str = Field(env='SECRET_KEY', default='your-secret-key-here')
@@ -53,6 +67,26 @@ class Settings(BaseSettings):
     USE_HUGGINGFACE: bool = Field(env='USE_HUGGINGFACE', default=False)
     HUGGINGFACE_API_KEY: SecretStr = Field(env='HUGGINGFACE_API_KEY', default='')
     HUGGINGFACE_MODEL: str = Field(env='HUGGINGFACE_MODEL', default='google/flan-t5-base')
+    REQUEST_TIMEOUT: float = Field(env='REQUEST_TIMEOUT', default=30.0)
+    HF_BATCH_MAX_SIZE: int = Field(env='HF_BATCH_MAX_SIZE', default=16)
+    HF_BATCH_WAIT_MS: float = Field(env='HF_BATCH_WAIT_MS', default=10.0)
+    HF_MAX_CONCURRENT_BATCHES: int = Field(env='HF_MAX_CONCURRENT_BATCHES', default=1)
+    HF_QPS_LIMIT: float = Field(env='HF_QPS_LIMIT', default=0.0)
+    HF_MAX_CONCURRENCY: int = Field(env='HF_MAX_CONCURRENCY', default=8)
+
+    # Redis Settings
+    REDIS_HOST: str = Field(env='REDIS_HOST', default='localhost')
+    REDIS_PORT: int = Field(env='REDIS_PORT', default=6379)
+    CACHE_TTL: int = Field(env='CACHE_TTL', default=3600)
+    SESSION_TTL: int = Field(env='SESSION_TTL', default=86400)
+
+    # AI Response Cache Settings
+    AI_CACHE_TTL: int = Field(env='AI_CACHE_TTL', default=86400)
+    # Bag-of-words similarity can't tell "enable" from "disable"; with a high threshold
+    # one differing word rejects a match for queries up to ~30 words
+    AI_CACHE_SIMILARITY_THRESHOLD: float = Field(env='AI_CACHE_SIMILARITY_THRESHOLD', default=0.97)
+    AI_CACHE_MIN_TOKENS: int = Field(env='AI_CACHE_MIN_TOKENS', default=4)
+    AI_CACHE_MAX_ENTRIES: int = Field(env='AI_CACHE_MAX_ENTRIES', default=1000)
 
     class Config:
         case_sensitive = True
@@ -83,6 +117,29 @@ class Settings(BaseSettings):
         """Get the MongoDB connection URL"""
         return self.MONGODB_URL
 
+    def is_serverless(self) -> bool:
+        """Whether we are running in a serverless function (Vercel / AWS Lambda)"""
+        return bool(os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+    def get_mongodb_options(self) -> Dict[str, Any]:
+        """Get MongoDB client options sized for the runtime environment"""
+        overridden = {"maxPoolSize", "minPoolSize"} & self.MONGODB_OPTIONS.keys()
+        if overridden:
+            logger.warning(f"Ignoring {sorted(overridden)} in MONGODB_OPTIONS; use MONGODB_MAX_POOL_SIZE / MONGODB_MIN_POOL_SIZE")
+        options = {
+            "appName": self.MONGODB_APP_NAME,
+            **self.MONGODB_OPTIONS,
+            "maxPoolSize": self.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": self.MONGODB_MIN_POOL_SIZE
+        }
+        if self.is_serverless():
+            # One invocation handles one request at a time; idle pooled sockets just leak
+            options.update({"maxPoolSize": 1, "minPoolSize": 0, "maxIdleTimeMS": 5000})
+            # A single connection only ever needs one host; stop SRV polling for the rest
+            if self.MONGODB_URL.startswith("mongodb+srv://"):
+                options["srvMaxHosts"] = 1
+        return options
+
     def get_secret_key(self) -> str:
         """Get the secret key for JWT"""
         return self.SECRET_KEY
@@ -111,7 +168,7 @@ class Settings(BaseSettings):
                 d[key] = value.get_secret_value()
         return d
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Get application settings"""
     settings = Settings()
@@ -1,144 +1,432 @@
 import logging
 import asyncio
-from typing import Optional, Dict, Any
+import random
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from collections import defaultdict
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, OperationFailure
+from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, ConfigurationError, OperationFailure
 from fastapi import HTTPException, status
-from core.config import settings  # Ensure settings.MONGODB_URL is of type SecretStr
-from bson import ObjectId, json_util, Decimal128
-import json
+from pymongo import IndexModel, monitoring
+from pymongo.server_api import ServerApi
 from datetime import datetime
 from .config import get_settings, Settings
+from .circuit_breaker import CircuitBreaker
 
+# Resolved once at import; get_settings() is memoized, so every module shares this instance
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-class JSONEncoder(json.JSONEncoder):
-    """Custom JSON encoder for MongoDB BSON types"""
-    def default(self, obj):
-        if isinstance(obj, (datetime, ObjectId)):
-            return str(obj)
-        if isinstance(obj, Decimal128):
-            return float(obj.to_decimal())
-        if isinstance(obj, bytes):
-            return obj.decode('utf-8')
-        return json.JSONEncoder.default(self, obj)
+# Connection retry schedule for initialize (seconds)
+INIT_MAX_RETRIES = settings.MONGODB_INIT_RETRIES
+RETRY_BASE_DELAY = settings.MONGODB_RETRY_BASE_DELAY
+RETRY_MAX_DELAY = settings.MONGODB_RETRY_MAX_DELAY
+WARMUP_TIMEOUT = 10.0
+
+# Index definitions as (collection, keys, options); applied by scripts/migrate_indexes.py
+# and, when AUTO_CREATE_INDEXES is set, on startup. Bump INDEX_SCHEMA_VERSION on any change.
+INDEXES = [
+    ("users", "email", {"unique": True}),
+    ("users", "username", {"unique": True}),
+    ("users", [("role", 1), ("is_active", 1)], {}),
+    ("messages", [("user_id", 1), ("created_at", -1)], {}),
+    ("messages", [("category", 1), ("created_at", -1)], {}),
+    ("categories", "name", {"unique": True}),
+    ("categories", "active", {}),
+    ("feedback", [("message_id", 1), ("created_at", -1)], {}),
+    ("feedback", [("user_id", 1), ("created_at", -1)], {}),
+]
+INDEX_SCHEMA_VERSION = 2
+
+# Bound once initialization succeeds so the request dependency is a plain global read
+DB: Optional[AsyncIOMotorDatabase] = None
+
+# Bulkhead bounding how many requests may hold the database at once
+_db_bulkhead = asyncio.Semaphore(settings.DB_CONCURRENCY_LIMIT)
+
+# Initialization error handling by exception type: (log prefix, retry?, discard client?).
+# Unusable configurations drop the client; anything else keeps it so its pool can recover.
+_INIT_ERROR_MAP = {
+    ServerSelectionTimeoutError: ("Database connection timed out", True, False),
+    ConnectionFailure: ("Database connection failed", True, False),
+    ConfigurationError: ("Invalid database configuration", False, True),
+    OperationFailure: ("Database operation failed", False, False),
+}
+
+def _classify_init_error(error: Exception) -> Tuple[str, bool, bool]:
+    """Look up the most specific _INIT_ERROR_MAP entry for an exception"""
+    for error_type in type(error).__mro__:
+        if error_type in _INIT_ERROR_MAP:
+            return _INIT_ERROR_MAP[error_type]
+    return ("Database initialization failed", False, False)
+
+class PoolSaturationListener(monitoring.ConnectionPoolListener):
+    """Count connection checkouts that timed out waiting for a free pooled socket.
+
+    A non-zero count means waitQueueTimeoutMS fired and maxPoolSize should be raised.
+    """
+
+    def __init__(self):
+        self.saturated_count = 0
+
+    def connection_check_out_failed(self, event):
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self.saturated_count += 1
+            logger.warning("MongoDB pool saturated (pool_saturated=True, total=%d) on %s", self.saturated_count, event.address)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_checked_out(self, event): pass
+    def connection_checked_in(self, event): pass
+
+class HeartbeatBreakerListener(monitoring.ServerHeartbeatListener):
+    """Feed server heartbeat outcomes into Database.breaker.
+
+    Routes turn driver errors into their own HTTP errors, so the breaker can't
+    rely on exceptions reaching the app; the driver's monitor notices an outage
+    (and the recovery) regardless of traffic. Heartbeats run on pymongo's monitor
+    threads, so the breaker is updated on the event loop that owns the client.
+    """
+
+    def _notify(self, callback) -> None:
+        loop = Database._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(callback)
+
+    def failed(self, event):
+        logger.warning("MongoDB heartbeat to %s failed: %s", event.connection_id, event.reply)
+        self._notify(Database.breaker.record_failure)
+
+    def succeeded(self, event):
+        # Only a change of state needs the loop; routine heartbeats stay cheap
+        if Database.breaker.state != CircuitBreaker.CLOSED or Database.breaker.failures:
+            self._notify(Database.breaker.record_success)
+
+    def started(self, event): pass
 
 class Database:
     """Database connection manager"""
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[AsyncIOMotorDatabase] = None
     initialized: bool = False
-    json_encoder = JSONEncoder()
+    _indexes_created: bool = False
+    _init_lock: Optional[asyncio.Lock] = None
+    _setup_task: Optional[asyncio.Task] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    breaker = CircuitBreaker("mongodb", failure_threshold=5, recovery_timeout=30.0)
+    pool_listener = PoolSaturationListener()
+    heartbeat_listener = HeartbeatBreakerListener()
 
     @classmethod
     async def initialize(cls) -> None:
         """Initialize database connection and setup"""
+        # Motor clients and asyncio locks are tied to the loop they were created on; if a
+        # new loop takes over (tests, one-off tools, reloads) start over with fresh ones
+        loop = asyncio.get_running_loop()
+        if cls._loop is not None and cls._loop is not loop:
+            logger.info("Event loop changed, recreating the MongoDB client")
+            cls.close()
+            cls._init_lock = None
+
         if cls.initialized:
             return
 
-        settings: Settings = get_settings()
-        try:
-            logger.info("Initializing database connection...")
-            cls.client = AsyncIOMotorClient(
-                settings.get_mongodb_url(),
-                **settings.MONGODB_OPTIONS
+        # Concurrent first requests wait for one initialization instead of each building a client
+        if cls._init_lock is None:
+            cls._init_lock = asyncio.Lock()
+        async with cls._init_lock:
+            if cls.initialized:
+                return
+            await cls._connect()
+
+    @classmethod
+    async def _connect(cls) -> None:
+        """Create the client, warm it up and prepare collections"""
+        # Fail fast while MongoDB is known to be down instead of waiting on server selection
+        if not cls.breaker.allow_request():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database unavailable"
             )
-            cls.db = cls.client[settings.MONGODB_DB_NAME]
-            
-            # Test connection
-            await cls.client.admin.command('ping')
-            logger.info(f"Connected to MongoDB: {settings.MONGODB_DB_NAME}")
-            
-            # Clean up null usernames before creating indexes
-            await cls._cleanup_null_usernames()
-            
-            # Create indexes after cleanup
+
+        for attempt in range(INIT_MAX_RETRIES):
+            try:
+                if __debug__:
+                    logger.debug("Initializing database connection...")
+                # One client per process; Motor's pool handles reconnection internally
+                if cls.client is None:
+                    cls.client = AsyncIOMotorClient(
+                        settings.get_mongodb_url(),
+                        server_api=ServerApi("1"),
+                        event_listeners=[cls.pool_listener, cls.heartbeat_listener],
+                        **settings.get_mongodb_options()
+                    )
+                    cls.db = cls.client[settings.MONGODB_DB_NAME]
+                    cls._loop = asyncio.get_running_loop()
+
+                # Warm up the pool so the first requests don't pay for the handshake: concurrent
+                # no-op reads make the pool open minPoolSize sockets at once. This also
+                # surfaces an unreachable cluster via serverSelectionTimeoutMS
+                warm_connections = max(1, cls.client.options.pool_options.min_pool_size)
+                try:
+                    # wait_for cancels the pending reads on timeout; the client is kept for the retry
+                    await asyncio.wait_for(asyncio.gather(*(
+                        cls.db.users.find_one({"_id": {"$exists": False}})
+                        for _ in range(warm_connections)
+                    )), timeout=WARMUP_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise ConnectionFailure(f"MongoDB warmup timed out after {WARMUP_TIMEOUT}s")
+                logger.info("Connected to MongoDB: %s", settings.MONGODB_DB_NAME)
+
+                cls.initialized = True
+                global DB
+                DB = cls.db
+                cls.breaker.record_success()
+
+                # Data cleanup and index builds don't need to block startup
+                cls._setup_task = asyncio.create_task(cls._prepare_collections(settings))
+                cls._setup_task.add_done_callback(cls._log_setup_failure)
+                return
+
+            except Exception as e:
+                prefix, retryable, reset_client = _classify_init_error(e)
+                if retryable and attempt < INIT_MAX_RETRIES - 1:
+                    # Exponential backoff with full jitter so cold-starting workers don't retry in lockstep
+                    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                    logger.warning("%s, retrying in %.2fs: %s", prefix, delay, e)
+                    await asyncio.sleep(delay)
+                    continue
+
+                logger.error("%s: %s", prefix, e)
+                if reset_client:
+                    cls._reset_client()
+                cls.breaker.record_failure()
+                raise
+
+    @classmethod
+    async def _prepare_collections(cls, settings: Settings) -> None:
+        """Clean up data and build indexes in the background after connecting"""
+        # Clean up null usernames before creating indexes
+        await cleanup_null_usernames(cls.db)
+
+        # Indexes are normally built by scripts/migrate_indexes.py before deploy
+        if settings.AUTO_CREATE_INDEXES:
             await cls._create_indexes()
-            
-            cls.initialized = True
-            
-        except Exception as e:
-            logger.error(f"Database initialization failed: {str(e)}")
-            if cls.client:
-                cls.client.close()
-            cls.client = None
-            cls.db = None
-            raise
+
+    @staticmethod
+    def _log_setup_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error("Background database setup failed: %s", task.exception())
 
     @classmethod
-    async def _cleanup_null_usernames(cls) -> None:
-        """Clean up users with null usernames"""
-        try:
-            # Find users with null usernames
-            async for user in cls.db.users.find({"username": None}):
-                # Generate a username based on email or a default pattern
-                email_prefix = user.get('email', '').split('@')[0] if user.get('email') else f'user_{str(user["_id"])}'
-                new_username = email_prefix
-                
-                # Ensure username uniqueness
-                counter = 1
-                while await cls.db.users.find_one({"username": new_username}):
-                    new_username = f"{email_prefix}_{counter}"
-                    counter += 1
-                
-                # Update the user with the new username
-                await cls.db.users.update_one(
-                    {"_id": user["_id"]},
-                    {"$set": {"username": new_username}}
-                )
-                logger.info(f"Updated null username for user {user['_id']} to {new_username}")
-                
-        except Exception as e:
-            logger.error(f"Error cleaning up null usernames: {str(e)}")
-            raise
+    def _reset_client(cls) -> None:
+        """Discard a partially initialized client"""
+        if cls.client:
+            cls.client.close()
+        cls.client = None
+        cls.db = None
+        cls._loop = None
 
     @classmethod
     async def _create_indexes(cls) -> None:
         """Create database indexes"""
-        try:
-            # Drop existing indexes to recreate them
-            try:
-                await cls.db.users.drop_indexes()
-                await cls.db.messages.drop_indexes()
-                await cls.db.categories.drop_indexes()
-                logger.info("Dropped existing indexes")
-            except Exception as e:
-                logger.warning(f"Error dropping indexes (this is okay for first run): {str(e)}")
-
-            # Create indexes
-            await cls.db.users.create_index("email", unique=True)
-            await cls.db.users.create_index("username", unique=True)
-            await cls.db.messages.create_index([("user_id", 1), ("created_at", -1)])
-            await cls.db.categories.create_index("name", unique=True)
-            logger.info("Created database indexes successfully")
-            
-        except Exception as e:
-            logger.error(f"Error creating indexes: {str(e)}")
-            raise
+        if cls._indexes_created:
+            return
+        await create_indexes(cls.db)
+        cls._indexes_created = True
 
     @classmethod
     def get_db(cls) -> AsyncIOMotorDatabase:
-        """Get database instance"""
-        if not cls.initialized or not cls.db:
-            raise RuntimeError("Database not initialized. Call initialize() first.")
+        """Get database instance (the app lifespan guarantees initialization)"""
+        assert cls.db is not None, "Database not initialized. Call initialize() first."
         return cls.db
 
     @classmethod
-    async def close(cls) -> None:
-        """Close database connection"""
+    async def server_info(cls) -> Dict[str, Any]:
+        """Query the server for its build info (health checks and breaker probes)"""
+        if cls.client is None:
+            raise RuntimeError("Database not initialized. Call initialize() first.")
+        try:
+            info = await cls.client.server_info()
+        except Exception:
+            cls.breaker.record_failure()
+            raise
+        cls.breaker.record_success()
+        return info
+
+    @classmethod
+    async def check_available(cls) -> None:
+        """Reject requests with 503 while the breaker is open.
+
+        Once the cooldown has passed, the first caller probes the server with
+        ``server_info()``; its outcome closes the circuit or keeps it open.
+        """
+        if not cls.breaker.allow_request():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database unavailable"
+            )
+        if cls.breaker.state == CircuitBreaker.HALF_OPEN:
+            try:
+                await cls.server_info()
+            except Exception:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Database unavailable"
+                )
+
+    @classmethod
+    def close(cls) -> None:
+        """Close database connection (Motor's close() is synchronous)"""
+        if cls._setup_task and not cls._setup_task.done():
+            cls._setup_task.cancel()
         if cls.client:
             cls.client.close()
             cls.client = None
             cls.db = None
+            cls._loop = None
             cls.initialized = False
+            global DB
+            DB = None
             logger.info("Closed database connection")
 
-async def get_db_dependency() -> AsyncIOMotorDatabase:
-    """FastAPI dependency for database access"""
-    if not Database.initialized:
-        await Database.initialize()
-    return Database.get_db()
+async def cleanup_null_usernames(db: AsyncIOMotorDatabase) -> None:
+    """Give users with a null or missing username a unique one (must run before the unique username index is built)"""
+    try:
+        # Warm starts on a clean database stop at this single indexed lookup
+        if await db.users.count_documents({"username": None}, limit=1) == 0:
+            return
+
+        # Derive "<email prefix or 'user'>_<_id>" server-side in one round trip;
+        # the _id suffix makes the name unique without probing for collisions
+        result = await db.users.update_many({"username": None}, [
+            {"$set": {"username": {"$concat": [
+                {"$ifNull": [{"$arrayElemAt": [{"$split": ["$email", "@"]}, 0]}, "user"]},
+                "_",
+                {"$toString": "$_id"}
+            ]}}}
+        ])
+        logger.info("Assigned usernames to %d users with null usernames", result.modified_count)
+
+    except Exception as e:
+        logger.error("Error cleaning up null usernames: %s", e)
+        raise
+
+async def create_indexes(db: AsyncIOMotorDatabase, rebuild_changed: bool = False) -> None:
+    """Build INDEXES unless the _meta collection says this schema version already exists.
+
+    Missing indexes are created; indexes the application doesn't define are never
+    touched. An index whose definition changed is only rebuilt (dropped and
+    recreated) with ``rebuild_changed``, which scripts/migrate_indexes.py passes;
+    otherwise it is reported and the schema version is left for the migration.
+    """
+    try:
+        # Skip if another worker already built the current index schema
+        meta = await db["_meta"].find_one({"_id": "indexes"})
+        if meta and meta.get("version") == INDEX_SCHEMA_VERSION:
+            return
+
+        # One list/createIndexes round per collection, all collections concurrently
+        models: Dict[str, List[IndexModel]] = defaultdict(list)
+        for collection, keys, options in INDEXES:
+            models[collection].append(IndexModel(keys, background=True, **options))
+        # A failing collection neither cancels the others nor hides which one failed
+        results = await asyncio.gather(*(
+            _sync_collection_indexes(db, collection, indexes, rebuild_changed)
+            for collection, indexes in models.items()
+        ), return_exceptions=True)
+        failures = [(collection, result) for collection, result in zip(models, results) if isinstance(result, Exception)]
+        for collection, error in failures:
+            logger.error("Error syncing indexes for %s: %s", collection, error)
+        if failures:
+            raise failures[0][1]
+        if not all(results):
+            logger.warning("Some index definitions changed; run scripts/migrate_indexes.py to rebuild them")
+            return
+        if __debug__:
+            logger.info("Database indexes are up to date")
+
+        await db["_meta"].update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": INDEX_SCHEMA_VERSION, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    except Exception as e:
+        logger.error("Error creating indexes: %s", e)
+        raise
+
+# Index document fields that don't affect what the index enforces or how it is used
+_INDEX_META_FIELDS = {"v", "name", "ns", "key", "background"}
+
+def _index_spec(document: Dict[str, Any]) -> Tuple[list, Dict[str, Any]]:
+    """Comparable (keys, options) of an index document or IndexModel.document"""
+    options = {
+        field: value for field, value in document.items()
+        if field not in _INDEX_META_FIELDS and value is not False
+    }
+    return list(document["key"].items()), options
+
+async def _sync_collection_indexes(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    models: List[IndexModel],
+    rebuild_changed: bool
+) -> bool:
+    """Create missing indexes (and rebuild changed ones if asked); False if any changed one was left as is"""
+    existing = {index["name"]: index async for index in db[collection].list_indexes()}
+
+    missing, changed = [], []
+    for model in models:
+        index = existing.get(model.document["name"])
+        if index is None:
+            missing.append(model)
+        elif _index_spec(index) != _index_spec(model.document):
+            changed.append(model)
+
+    for model in changed:
+        if rebuild_changed:
+            await db[collection].drop_index(model.document["name"])
+            logger.info("Dropped outdated index %s.%s", collection, model.document["name"])
+            missing.append(model)
+        else:
+            logger.warning("Index %s.%s differs from its definition", collection, model.document["name"])
+
+    if missing:
+        await db[collection].create_indexes(missing)
+        logger.info("Created %d index(es) on %s", len(missing), collection)
+    return rebuild_changed or not changed
+
+async def get_db() -> AsyncIOMotorDatabase:
+    """Database access for routes (as a dependency) and helpers (awaited); initialized in the app lifespan.
+
+    Kept as a coroutine on purpose: FastAPI runs plain ``def`` dependencies in
+    its threadpool, which costs far more than an await with no suspension.
+    """
+    if Database.breaker.state != CircuitBreaker.CLOSED:
+        await Database.check_available()
+    return DB
+
+# Older name kept as the same function object so FastAPI's per-request dependency cache still applies
+get_db_dependency = get_db
+
+async def get_db_bounded() -> AsyncIterator[AsyncIOMotorDatabase]:
+    """FastAPI dependency that holds a bulkhead slot for the rest of the request.
+
+    Use it for routes whose work is database I/O. When the cluster stalls, extra
+    requests wait here (where client timeouts can cancel them) instead of piling
+    up inside Motor's wait queue. Don't combine it with long non-DB work.
+    """
+    if Database.breaker.state != CircuitBreaker.CLOSED:
+        await Database.check_available()
+    async with _db_bulkhead:
+        yield DB
 
 async def init_db() -> None:
     """Initialize database connection"""
@@ -146,16 +434,4 @@ async def init_db() -> None:
 
 async def close_db() -> None:
     """Close database connection"""
-    await Database.close()
-
-def get_db() -> AsyncIOMotorDatabase:
-    """Get database instance synchronously"""
-    return Database.get_db()
-
-async def get_database() -> AsyncIOMotorDatabase:
-    """Get database instance asynchronously"""
-    if not Database.initialized:
-        await Database.initialize()
-    return Database.get_db()
-
-db = Database()
+    Database.close()
@@ -0,0 +1,69 @@
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import copy
+import logging
+import re
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Numbered backreferences would point at the wrong group once entries are wrapped
+# in named groups and merged
+NUMBERED_BACKREF_RE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+
+class FAQRouter:
+    """Answer well-known questions with canned responses, bypassing the AI engine.
+
+    Entries are loaded once from the ``faq`` collection as documents of the form
+    ``{"pattern": "<regex>", "solution": {...}}`` and merged into a single
+    alternation so each query is scanned once regardless of the number of FAQs.
+    """
+
+    def __init__(self):
+        self.pattern: Optional[re.Pattern] = None
+        self.solutions: List[Dict[str, Any]] = []
+
+    async def load(self, db: AsyncIOMotorDatabase) -> None:
+        """Load and compile FAQ entries from the database"""
+        try:
+            parts, solutions = [], []
+            pattern = None
+            async for entry in db.faq.find({}, {"pattern": 1, "solution": 1}):
+                # Each entry must also compile as part of the merged alternation (duplicate
+                # group names and non-leading inline flags only fail there)
+                try:
+                    if NUMBERED_BACKREF_RE.search(entry["pattern"]):
+                        raise re.error("numbered backreferences are not supported")
+                    part = f"(?P<faq{len(solutions)}>{entry['pattern']})"
+                    merged = re.compile("|".join(parts + [part]), re.IGNORECASE)
+                except (KeyError, TypeError, re.error) as e:
+                    logger.warning(f"Skipping invalid FAQ entry {entry.get('_id')}: {str(e)}")
+                    continue
+                parts.append(part)
+                solutions.append(entry.get("solution") or {})
+                pattern = merged
+
+            self.pattern = pattern
+            self.solutions = solutions
+            logger.info(f"Loaded {len(solutions)} FAQ entries")
+
+        except Exception as e:
+            logger.error(f"Error loading FAQ entries: {str(e)}")
+
+    def match(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return a canned response if the query matches a known FAQ"""
+        if self.pattern is None:
+            return None
+
+        found = self.pattern.search(query)
+        if not found:
+            return None
+
+        return {
+            "solution": copy.deepcopy(self.solutions[int(found.lastgroup[3:])]),
+            "needs_human": False,
+            "confidence_score": 1.0,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+faq_router = FAQRouter()
@@ -1,14 +1,20 @@
 import logging
 
+_configured = False
+
 def configure_logging():
-    """Configure logging settings for the application"""
+    """Configure logging settings for the application (only the first call has any effect)"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
     # Set log levels for different loggers
     loggers_to_silence = [
         "uvicorn.access",
         "pymongo",
         "motor",
         "multipart",
-        "passlib",
         "core.auth"
     ]
     
@@ -1,7 +1,10 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
 import numpy as np
+import xxhash
 from datetime import datetime
 import logging
+import time
 from core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -10,25 +13,33 @@ class MLEngine:
     def __init__(self):
         """Initialize the ML Engine with basic text processing capabilities"""
         logger.info("Initializing ML Engine with basic text processing")
-        self.cache = {}
+        # Insertion-ordered so the oldest query is evicted in O(1)
+        self.cache: OrderedDict = OrderedDict()
+        # Pre-normalized float16 embeddings of cached queries, one row per entry in
+        # self._keys, so similarity search is a single matrix-vector product
+        self._emb_matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
         
-    def _get_simple_embedding(self, text: str) -> List[float]:
-        """Generate a simple embedding based on word frequencies"""
-        # Simple word frequency-based embedding
+    def embed(self, text: str) -> np.ndarray:
+        """Unit-normalized float32 bag-of-words embedding of ``text`` (zero for empty text)"""
+        # Simple word frequency-based embedding in a 100-dimensional space;
+        # each word's hash picks its position and np.add.at accumulates repeats.
+        # xxh64 is stable across processes (unlike hash()), so stored embeddings stay comparable
         words = text.lower().split()
-        embedding = np.zeros(100)  # Using 100-dimensional space
-        
-        for i, word in enumerate(words):
-            # Use hash of word to determine the position
-            pos = hash(word) % 100
-            embedding[pos] += 1
-            
+        positions = np.fromiter((xxhash.xxh64_intdigest(word) for word in words), dtype=np.uint64, count=len(words)) % 100
+        embedding = np.zeros(100, dtype=np.float32)
+        np.add.at(embedding, positions, 1.0)
+
         # Normalize the embedding
         norm = np.linalg.norm(embedding)
         if norm > 0:
-            embedding = embedding / norm
-            
-        return embedding.tolist()
+            embedding /= norm
+
+        return embedding
+
+    def _get_simple_embedding(self, text: str) -> List[float]:
+        """Generate a simple embedding based on word frequencies"""
+        return self.embed(text).tolist()
 
     def _calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
@@ -43,26 +54,65 @@ class MLEngine:
             
         return float(np.dot(vec1, vec2) / (norm1 * norm2))
 
+    def _store_embedding(self, query: str, embedding: List[float]) -> int:
+        """Write an embedding into the matrix, growing it by doubling, and return its row"""
+        entry = self.cache.get(query)
+        if entry is not None:
+            row = entry["row"]
+        else:
+            row = len(self._keys)
+            if self._emb_matrix is None:
+                self._emb_matrix = np.zeros((64, len(embedding)), dtype=np.float16)
+            elif row == self._emb_matrix.shape[0]:
+                grown = np.zeros((row * 2, self._emb_matrix.shape[1]), dtype=np.float16)
+                grown[:row] = self._emb_matrix
+                self._emb_matrix = grown
+            self._keys.append(query)
+        self._emb_matrix[row] = embedding
+        return row
+
+    def _remove_embedding(self, row: int) -> None:
+        """Free a matrix row by moving the last row into its place"""
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._emb_matrix[row] = self._emb_matrix[last]
+            self._keys[row] = moved
+            self.cache[moved]["row"] = row
+        self._keys.pop()
+
     async def find_similar_queries(self, query: str, threshold: float = 0.5) -> List[Dict[str, Any]]:
         """Find similar queries from the cache"""
         try:
-            query_embedding = self._get_simple_embedding(query)
+            count = len(self._keys)
+            if not count:
+                return []
+
+            # Both sides are unit-normalized, so the dot product is the cosine similarity
+            query_embedding = self.embed(query)
+            # Stored as float16 to halve memory; widened for the product since numpy has no fp16 BLAS
+            scores = self._emb_matrix[:count].astype(np.float32) @ query_embedding
+
+            top_k = min(5, count)
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k] if count > top_k else np.arange(count)
+            candidates = candidates[np.argsort(-scores[candidates])]
+
             similar_queries = []
-            
-            for cached_query, data in self.cache.items():
-                similarity = self._calculate_similarity(query_embedding, data["embedding"])
-                if similarity > threshold:
-                    similar_queries.append({
-                        "query": cached_query,
-                        "similarity": similarity,
-                        "category": data.get("category", "General"),
-                        "timestamp": data.get("timestamp", datetime.utcnow().isoformat())
-                    })
-            
-            # Sort by similarity score
-            similar_queries.sort(key=lambda x: x["similarity"], reverse=True)
-            return similar_queries[:5]  # Return top 5 similar queries
-            
+            for row in candidates:
+                similarity = float(scores[row])
+                if similarity <= threshold:
+                    break
+                cached_query = self._keys[row]
+                data = self.cache[cached_query]
+                similar_queries.append({
+                    "query": cached_query,
+                    "similarity": similarity,
+                    "category": data.get("category", "General"),
+                    "timestamp": datetime.utcfromtimestamp(data["timestamp"] / 1e9).isoformat()
+                })
+
+            return similar_queries  # Top 5 similar queries, best first
+
         except Exception as e:
             logger.error(f"Error finding similar queries: {str(e)}")
             return []
@@ -72,16 +122,16 @@ class MLEngine:
         try:
             embedding = self._get_simple_embedding(query)
             self.cache[query] = {
-                "embedding": embedding,
+                "row": self._store_embedding(query, embedding),
                 "category": category,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": time.time_ns()  # Formatted only when returned by find_similar_queries
             }
+            self.cache.move_to_end(query)
             
-            # Keep cache size manageable
-            if len(self.cache) > 1000:
-                # Remove oldest entries
-                sorted_queries = sorted(self.cache.items(), key=lambda x: x[1]["timestamp"])
-                self.cache = dict(sorted_queries[-1000:])
+            # Keep cache size manageable by removing the oldest entries
+            while len(self.cache) > 1000:
+                _, evicted = self.cache.popitem(last=False)
+                self._remove_embedding(evicted["row"])
                 
         except Exception as e:
             logger.error(f"Error adding query to cache: {str(e)}")
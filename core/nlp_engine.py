@@ -1,9 +1,17 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import contextlib
+import logging
+import time
+import re
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from sklearn.cluster import KMeans
+import xxhash
+from sklearn.cluster import MiniBatchKMeans
 import pinecone
 from ..core.config import settings
-import redis
+import redis.asyncio as redis
 from datetime import datetime
 import nltk
 from nltk.tokenize import word_tokenize
@@ -11,39 +19,78 @@ from nltk.tag import pos_tag
 from nltk.chunk import ne_chunk
 from nltk.sentiment import SentimentIntensityAnalyzer
 
+logger = logging.getLogger(__name__)
+
+# Keyword sets for intent classification, with each set's per-match weight
+INTENT_KEYWORDS = {
+    "technical_issue": frozenset({"error", "bug", "issue", "problem", "crash", "fix", "broken"}),
+    "feature_request": frozenset({"add", "feature", "implement", "support", "request", "enhance"}),
+    "bug_report": frozenset({"bug", "report", "error", "fail", "crash", "incorrect"}),
+    "general_inquiry": frozenset({"how", "what", "when", "where", "why", "help", "explain"})
+}
+INTENT_WEIGHTS = {intent: 1 / len(keywords) for intent, keywords in INTENT_KEYWORDS.items()}
+# Keywords are plain lowercase words, so a regex split is enough here; no NLTK tokenizer needed
+WORD_RE = re.compile(r"[a-z]+")
+
+# Pinecone upserts are buffered and sent once this many vectors are pending,
+# or at the latest after UPSERT_MAX_DELAY seconds
+UPSERT_BATCH_SIZE = 100
+UPSERT_MAX_DELAY = 2.0
+
+# NLTK data needed by the engine, as (resource path, download package)
+NLTK_RESOURCES = [
+    ('tokenizers/punkt', 'punkt'),
+    ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger'),
+    ('chunkers/maxent_ne_chunker', 'maxent_ne_chunker'),
+    ('corpora/words', 'words'),
+    ('sentiment/vader_lexicon', 'vader_lexicon'),
+]
+
+def _fetch_nltk_resource(path: str, package: str) -> None:
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(package, quiet=True, raise_on_error=False)
+
+@lru_cache(maxsize=1)
+def _ensure_nltk() -> None:
+    """Download any missing NLTK data, all resources in parallel, once per process"""
+    with ThreadPoolExecutor(max_workers=len(NLTK_RESOURCES)) as pool:
+        list(pool.map(lambda resource: _fetch_nltk_resource(*resource), NLTK_RESOURCES))
+
+# process_query and its helpers all look at the same text; memoize the NLTK
+# passes so each distinct string is tokenized, tagged and scored only once.
+# Results are shared between callers and must not be mutated.
+@lru_cache(maxsize=2048)
+def _tok(text: str) -> Tuple[str, ...]:
+    _ensure_nltk()
+    return tuple(word_tokenize(text))
+
+@lru_cache(maxsize=2048)
+def _pos(text: str) -> Tuple[Tuple[str, str], ...]:
+    return tuple(pos_tag(list(_tok(text))))
+
+@lru_cache(maxsize=1)
+def _sentiment_analyzer() -> SentimentIntensityAnalyzer:
+    _ensure_nltk()
+    return SentimentIntensityAnalyzer()
+
+@lru_cache(maxsize=2048)
+def _sent(text: str) -> Dict[str, float]:
+    return _sentiment_analyzer().polarity_scores(text)
+
 class NLPEngine:
     def __init__(self):
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        try:
-            nltk.data.find('taggers/averaged_perceptron_tagger')
-        except LookupError:
-            nltk.download('averaged_perceptron_tagger')
-        try:
-            nltk.data.find('chunkers/maxent_ne_chunker')
-        except LookupError:
-            nltk.download('maxent_ne_chunker')
-        try:
-            nltk.data.find('corpora/words')
-        except LookupError:
-            nltk.download('words')
-        try:
-            nltk.data.find('sentiment/vader_lexicon')
-        except LookupError:
-            nltk.download('vader_lexicon')
-
-        # Initialize NLP components
-        self.sentiment_analyzer = SentimentIntensityAnalyzer()
-        
         # Initialize Pinecone for vector similarity search
         pinecone.init(
             api_key=settings.PINECONE_API_KEY,
             environment=settings.PINECONE_ENV
         )
         self.index = pinecone.Index(settings.PINECONE_INDEX_NAME)
+        self._pending: List[tuple] = []
+        self._flush_lock = asyncio.Lock()
+        # Started on first use, since the engine may be constructed outside a running event loop
+        self._flush_task: Optional[asyncio.Task] = None
         
         # Initialize Redis for caching
         self.redis_client = redis.Redis(
@@ -54,28 +101,37 @@ class NLPEngine:
         )
         
         # Initialize query clustering
-        self.kmeans = KMeans(n_clusters=10, random_state=42)
-        self.query_embeddings = []
+        # Updated incrementally from the latest batch of queries, so no history is kept
+        self.kmeans = MiniBatchKMeans(n_clusters=10, random_state=42, batch_size=100, n_init='auto')
+        self._pending_batch: List[np.ndarray] = []
         self.query_texts = []
 
+    @property
+    def sentiment_analyzer(self) -> SentimentIntensityAnalyzer:
+        return _sentiment_analyzer()
+
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
-        # Extract entities using NLTK NER
-        tokens = word_tokenize(query)
-        pos_tags = pos_tag(tokens)
-        named_entities = ne_chunk(pos_tags)
+        # NLTK data may still need downloading on the first query; keep that off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, _ensure_nltk)
+
+        # The text-only analyses run in one worker thread while the embedding is computed
+        embedding_task = asyncio.create_task(self.get_embedding(query))
+        named_entities, sentiment_scores, intent, complexity, tech_requirements = await asyncio.to_thread(
+            self._analyze_text, query
+        )
         entities = []
         for chunk in named_entities:
             if hasattr(chunk, 'label'):
                 entities.append(((' '.join(c[0] for c in chunk)), chunk.label()))
+        query_embedding = await embedding_task
         
-        # Get query embedding
-        query_embedding = await self.get_embedding(query)
-        
-        # Search for similar queries in Pinecone
-        similar_queries = await self.search_similar_queries(query_embedding)
-        
-        # Get cached response if available
-        cached_response = self.redis_client.get(f"query:{query}")
+        # Similar-query search, clustering and the cache lookup only need the embedding
+        similar_queries, cluster, cached_response = await asyncio.gather(
+            self._search_with_cached_responses(query_embedding),
+            self.cluster_query(query_embedding),
+            self.redis_client.get(f"query:{query}")
+        )
+
         if cached_response:
             return {
                 "response": cached_response,
@@ -84,11 +140,6 @@ class NLPEngine:
                 "similar_queries": similar_queries
             }
         
-        # Cluster the query
-        cluster = await self.cluster_query(query_embedding)
-        
-        # Analyze sentiment
-        sentiment_scores = self.sentiment_analyzer.polarity_scores(query)
         sentiment = {
             "compound": sentiment_scores["compound"],
             "positive": sentiment_scores["pos"],
@@ -96,15 +147,6 @@ class NLPEngine:
             "neutral": sentiment_scores["neu"]
         }
         
-        # Classify query intent based on keywords
-        intent = self.classify_intent(query)
-        
-        # Analyze complexity
-        complexity = self.analyze_complexity(query)
-        
-        # Extract technical requirements
-        tech_requirements = self.extract_technical_requirements(query)
-        
         return {
             "processed_query": query,
             "entities": entities,
@@ -118,42 +160,45 @@ class NLPEngine:
             "context": context
         }
 
+    def _analyze_text(self, query: str) -> tuple:
+        """Run the NLTK-based analyses back to back so they share the memoized _tok/_pos results"""
+        return (
+            ne_chunk(list(_pos(query))),  # Entities via NLTK NER
+            _sent(query),
+            self.classify_intent(query),
+            self.analyze_complexity(query),
+            self.extract_technical_requirements(query)
+        )
+
     def classify_intent(self, query: str) -> Dict[str, float]:
         """Classify query intent using keyword matching"""
-        query_lower = query.lower()
-        words = set(word_tokenize(query_lower))
-        
-        # Define intent keywords
-        intent_keywords = {
-            "technical_issue": {"error", "bug", "issue", "problem", "crash", "fix", "broken"},
-            "feature_request": {"add", "feature", "implement", "support", "request", "enhance"},
-            "bug_report": {"bug", "report", "error", "fail", "crash", "incorrect"},
-            "general_inquiry": {"how", "what", "when", "where", "why", "help", "explain"}
-        }
+        words = set(WORD_RE.findall(query.lower()))
         
         # Calculate scores based on keyword matches
-        scores = {}
-        for intent, keywords in intent_keywords.items():
-            matches = words.intersection(keywords)
-            scores[intent] = len(matches) / len(keywords) if matches else 0.0
+        scores = {
+            intent: len(words & keywords) * INTENT_WEIGHTS[intent]
+            for intent, keywords in INTENT_KEYWORDS.items()
+        }
             
         # Normalize scores
         total = sum(scores.values()) or 1.0
         return {k: v/total for k, v in scores.items()}
 
     async def get_embedding(self, text: str) -> np.ndarray:
-        # Simple bag-of-words embedding
-        words = word_tokenize(text.lower())
-        embedding = np.zeros(768)  # Keep same dimension for compatibility
-        for i, word in enumerate(words):
-            # Use hash of word to determine position
-            pos = hash(word) % 768
-            embedding[pos] = 1.0
-        return embedding / (len(words) or 1)
+        # Simple bag-of-words embedding, unit-normalized so cosine scores are comparable
+        words = _tok(text.lower())
+        if not words:
+            return np.zeros(768, dtype=np.float32)  # Keep same dimension for compatibility
+        # xxh64 is stable across processes (unlike hash()), so vectors stored in Pinecone stay comparable
+        positions = np.fromiter((xxhash.xxh64_intdigest(word) for word in words), dtype=np.uint64, count=len(words)) % 768
+        embedding = np.bincount(positions.astype(np.intp), minlength=768).astype(np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
 
     async def search_similar_queries(self, embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
-        # Search Pinecone index
-        results = self.index.query(
+        # Search Pinecone index; the client is synchronous, so keep it off the event loop
+        results = await asyncio.to_thread(
+            self.index.query,
             vector=embedding.tolist(),
             top_k=top_k,
             include_metadata=True
@@ -165,23 +210,39 @@ class NLPEngine:
             "timestamp": match.metadata.get("timestamp")
         } for match in results.matches]
 
+    async def _search_with_cached_responses(self, embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """Search similar queries and attach their cached responses, fetched in one round trip"""
+        similar_queries = await self.search_similar_queries(embedding)
+        if similar_queries:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for similar in similar_queries:
+                    pipe.get(f"query:{similar['query']}")
+                responses = await pipe.execute()
+            for similar, response in zip(similar_queries, responses):
+                similar["cached_response"] = response
+        return similar_queries
+
     async def cluster_query(self, embedding: np.ndarray) -> int:
-        # Add to existing embeddings
-        self.query_embeddings.append(embedding)
+        # Add to the batch for the next model update
+        self._pending_batch.append(embedding)
         
-        # Retrain clustering model periodically
-        if len(self.query_embeddings) % 100 == 0:
-            embeddings_array = np.array(self.query_embeddings)
-            self.kmeans.fit(embeddings_array)
+        # Update clustering model with each full batch
+        if len(self._pending_batch) >= 100:
+            self.kmeans.partial_fit(np.asarray(self._pending_batch, dtype=np.float32))
+            self._pending_batch.clear()
+        
+        # No clusters until the first batch has been fitted
+        if not hasattr(self.kmeans, "cluster_centers_"):
+            return -1
         
         # Get cluster for current query
-        cluster = self.kmeans.predict([embedding])[0]
+        cluster = self.kmeans.predict(embedding.reshape(1, -1))[0]
         return int(cluster)
 
     def analyze_complexity(self, query: str) -> float:
         """Analyze query complexity"""
-        words = word_tokenize(query)
-        pos_tags = pos_tag(words)
+        words = _tok(query)
+        pos_tags = _pos(query)
         
         # Factors affecting complexity
         sentence_length = len(words)
@@ -199,8 +260,7 @@ class NLPEngine:
 
     def extract_technical_requirements(self, query: str) -> List[str]:
         """Extract technical requirements from query"""
-        words = word_tokenize(query.lower())
-        pos_tags = pos_tag(words)
+        pos_tags = _pos(query.lower())
         requirements = []
         
         # Technical requirement patterns
@@ -224,7 +284,7 @@ class NLPEngine:
 
     async def cache_response(self, query: str, response: str, ttl: int = 3600):
         # Cache the response in Redis
-        self.redis_client.setex(
+        await self.redis_client.setex(
             f"query:{query}",
             ttl,
             response
@@ -234,18 +294,67 @@ class NLPEngine:
         # Get query embedding
         embedding = await self.get_embedding(query)
         
-        # Store in Pinecone with metadata
-        self.index.upsert([
-            (
-                f"query_{datetime.now().timestamp()}",
-                embedding.tolist(),
-                {
-                    "query": query,
-                    "response": response,
-                    "feedback": feedback,
-                    "timestamp": datetime.now().isoformat()
-                }
-            )
-        ])
-
-nlp_engine = NLPEngine()
\ No newline at end of file
+        # Queue for Pinecone with metadata; sent in batches by _flush
+        now_ns = time.time_ns()
+        self._pending.append((
+            f"query_{now_ns}",
+            embedding.tolist(),
+            {
+                "query": query,
+                "response": response,
+                "feedback": feedback,
+                "timestamp": datetime.fromtimestamp(now_ns / 1e9).isoformat()
+            }
+        ))
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if len(self._pending) >= UPSERT_BATCH_SIZE:
+            await self._flush()
+
+    async def _flush(self):
+        """Upsert all pending vectors to Pinecone in one request"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                # The Pinecone client blocks; keep it off the event loop and wait for the result
+                await asyncio.to_thread(self.index.upsert, vectors=batch)
+            except Exception:
+                # Requeue ahead of newer vectors so the next flush retries them
+                self._pending[:0] = batch
+                raise
+
+    async def aclose(self):
+        """Stop the flush loop and send whatever is still queued"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self._flush()
+
+    async def _flush_loop(self):
+        """Bound how long a queued vector waits for its batch to fill"""
+        while True:
+            await asyncio.sleep(UPSERT_MAX_DELAY)
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Error upserting to Pinecone: {str(e)}")
+
+# Shared instance, created on first use so importing this module stays cheap
+_nlp_engine: Optional[NLPEngine] = None
+
+def get_nlp_engine() -> NLPEngine:
+    """Get the shared NLPEngine, creating it on first use"""
+    global _nlp_engine
+    if _nlp_engine is None:
+        _nlp_engine = NLPEngine()
+    return _nlp_engine
+
+async def shutdown_nlp_engine() -> None:
+    """Flush and stop the shared NLPEngine if it was ever created"""
+    if _nlp_engine is not None:
+        await _nlp_engine.aclose()
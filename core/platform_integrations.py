@@ -1,18 +1,71 @@
-from typing import Dict, Any, Optional, List
-from slack_sdk import WebClient
+from typing import Dict, Any, Optional, List, Tuple, Union
+from collections import OrderedDict
+import asyncio
+import hashlib
+import time
+import orjson
+from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
-import pymsteams
-import requests
+import aiohttp
+import httpx
 from .config import settings
+from .batching import AdaptiveLimiter, MicroBatcher
 import logging
 
+# Identical sends (same platform, channel, message and attachments) within this
+# many seconds return the first send's result instead of messaging again
+DEDUP_TTL = 60
+DEDUP_CACHE_SIZE = 10_000
+
+def _send_key(platform: str, channel_id: str, message: str, attachments: Optional[List[Dict[str, Any]]]) -> bytes:
+    """Content digest identifying a send for deduplication"""
+    digest = hashlib.blake2b(f"{platform}:{channel_id}:".encode(), digest_size=16)
+    digest.update(message.encode())
+    if attachments:
+        digest.update(orjson.dumps(attachments, option=orjson.OPT_SORT_KEYS))
+    return digest.digest()
+
+def _is_overload(exc: Exception) -> bool:
+    """Whether a provider error means it is rate limiting or overloaded (HTTP 429/5xx)"""
+    if isinstance(exc, SlackApiError):
+        status_code = getattr(exc.response, "status_code", None)
+    elif isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+    else:
+        return False
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
 class PlatformIntegrations:
     def __init__(self):
         # Initialize platform clients
-        self.slack = WebClient(token=settings.SLACK_BOT_TOKEN) if settings.SLACK_BOT_TOKEN else None
-        self.teams = pymsteams.connectorcard(settings.TEAMS_WEBHOOK_URL) if settings.TEAMS_WEBHOOK_URL else None
+        self.slack = AsyncWebClient(token=settings.SLACK_BOT_TOKEN) if settings.SLACK_BOT_TOKEN else None
+        self.teams_webhook_url = settings.TEAMS_WEBHOOK_URL
         self.whatsapp_token = settings.WHATSAPP_API_KEY
         self.whatsapp_url = "https://graph.facebook.com/v17.0"
+        # Shared keep-alive pool for WhatsApp and Teams, so sends don't block the
+        # event loop or redo the TLS handshake
+        self._http = httpx.AsyncClient(
+            base_url=self.whatsapp_url,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        # Outbound concurrency cap per provider for broadcasts
+        self._sem = {
+            "slack": asyncio.Semaphore(20),
+            "teams": asyncio.Semaphore(10),
+            "whatsapp": asyncio.Semaphore(50)
+        }
+        # Adaptive per-provider concurrency that backs off when the provider throttles
+        self._limiters = {
+            platform: AdaptiveLimiter(_is_overload, initial_limit=8, min_limit=1, max_limit=50)
+            for platform in ("slack", "teams", "whatsapp")
+        }
+        # WhatsApp takes one message per request; bursts arriving within 50ms are
+        # sent together so they share a burst on the connection pool
+        self.whatsapp_batcher = MicroBatcher(self._send_whatsapp_batch, max_batch_size=25, max_wait_ms=50)
+        # Recent successful sends as key -> (expiry, result); a constant TTL keeps
+        # insertion order equal to expiry order
+        self._dedup: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
 
     async def send_message(
         self,
@@ -23,18 +76,60 @@ class PlatformIntegrations:
     ) -> Dict[str, Any]:
         """Send message to specified platform"""
         try:
+            key = _send_key(platform, channel_id, message, attachments)
+            now = time.monotonic()
+            while self._dedup and next(iter(self._dedup.values()))[0] <= now:
+                self._dedup.popitem(last=False)
+            if key in self._dedup:
+                return self._dedup[key][1]
+
             if platform == "slack":
-                return await self._send_slack_message(channel_id, message, attachments)
+                send = self._send_slack_message
             elif platform == "teams":
-                return await self._send_teams_message(channel_id, message, attachments)
+                send = self._send_teams_message
             elif platform == "whatsapp":
-                return await self._send_whatsapp_message(channel_id, message, attachments)
+                send = self._send_whatsapp_message
             else:
                 raise ValueError(f"Unsupported platform: {platform}")
+            if platform == "whatsapp":
+                # Limited per request in _post_whatsapp_message; holding a slot here while
+                # waiting in the batcher would cap how many messages can coalesce
+                result = await send(channel_id, message, attachments)
+            else:
+                async with self._limiters[platform].slot():
+                    result = await send(channel_id, message, attachments)
+
+            self._dedup[key] = (time.monotonic() + DEDUP_TTL, result)
+            if len(self._dedup) > DEDUP_CACHE_SIZE:
+                self._dedup.popitem(last=False)
+            return result
         except Exception as e:
             logging.error(f"Error sending message to {platform}: {e}")
             raise
 
+    async def broadcast(
+        self,
+        targets: List[Tuple[str, str]],
+        message: str,
+        attachments: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Send a message to many (platform, channel_id) targets concurrently.
+
+        Results are returned in target order; a failed send yields its exception
+        instead of aborting the other sends.
+        """
+        async def send_one(platform: str, channel_id: str) -> Dict[str, Any]:
+            semaphore = self._sem.get(platform)
+            if semaphore is None:
+                raise ValueError(f"Unsupported platform: {platform}")
+            async with semaphore:
+                return await self.send_message(platform, channel_id, message, attachments)
+
+        return await asyncio.gather(
+            *(send_one(platform, channel_id) for platform, channel_id in targets),
+            return_exceptions=True
+        )
+
     async def _send_slack_message(
         self,
         channel_id: str,
@@ -43,6 +138,10 @@ class PlatformIntegrations:
     ) -> Dict[str, Any]:
         """Send message to Slack channel"""
         try:
+            # AsyncWebClient opens a session per call unless given one; keep one alive.
+            # Created here rather than in __init__ because aiohttp needs a running loop
+            if self.slack.session is None:
+                self.slack.session = aiohttp.ClientSession()
             response = await self.slack.chat_postMessage(
                 channel=channel_id,
                 text=message,
@@ -66,11 +165,23 @@ class PlatformIntegrations:
     ) -> Dict[str, Any]:
         """Send message to Microsoft Teams channel"""
         try:
-            self.teams.text(message)
+            # Legacy connector MessageCard, as previously built by pymsteams
+            card = {
+                "@type": "MessageCard",
+                "@context": "https://schema.org/extensions",
+                "text": message
+            }
             if attachments:
-                for attachment in attachments:
-                    self.teams.addLinkCard(attachment.get("title", ""), attachment.get("url", ""))
-            self.teams.send()
+                card["potentialAction"] = [
+                    {
+                        "@type": "OpenUri",
+                        "name": attachment.get("title", ""),
+                        "targets": [{"os": "default", "uri": attachment.get("url", "")}]
+                    }
+                    for attachment in attachments
+                ]
+            response = await self._http.post(self.teams_webhook_url, json=card)
+            response.raise_for_status()
             return {
                 "platform": "teams",
                 "success": True,
@@ -88,6 +199,25 @@ class PlatformIntegrations:
         attachments: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """Send message via WhatsApp"""
+        return await self.whatsapp_batcher.submit((phone_number, message, attachments))
+
+    async def _send_whatsapp_batch(
+        self,
+        items: List[Tuple[str, str, Optional[List[Dict[str, Any]]]]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Send a batch of coalesced WhatsApp messages concurrently, one result per item"""
+        return await asyncio.gather(
+            *(self._post_whatsapp_message(*item) for item in items),
+            return_exceptions=True
+        )
+
+    async def _post_whatsapp_message(
+        self,
+        phone_number: str,
+        message: str,
+        attachments: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Post a single message to the WhatsApp Graph API"""
         try:
             headers = {
                 "Authorization": f"Bearer {self.whatsapp_token}",
@@ -105,12 +235,13 @@ class PlatformIntegrations:
                 # Handle attachments if needed
                 pass
             
-            response = requests.post(
-                f"{self.whatsapp_url}/messages",
-                headers=headers,
-                json=data
-            )
-            response.raise_for_status()
+            async with self._limiters["whatsapp"].slot():
+                response = await self._http.post(
+                    "/messages",
+                    headers=headers,
+                    json=data
+                )
+                response.raise_for_status()
             result = response.json()
             
             return {
@@ -123,4 +254,11 @@ class PlatformIntegrations:
             logging.error(f"WhatsApp API error: {e}")
             raise
 
+    async def close(self):
+        """Stop the WhatsApp batcher and close the shared HTTP clients"""
+        await self.whatsapp_batcher.stop()
+        await self._http.aclose()
+        if self.slack and self.slack.session:
+            await self.slack.session.close()
+
 platform_integrations = PlatformIntegrations()
\ No newline at end of file
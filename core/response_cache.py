@@ -0,0 +1,174 @@
+from typing import Deque, Dict, Any, Optional, Tuple
+from collections import deque
+import hashlib
+import logging
+import time
+import numpy as np
+import orjson
+from .config import settings
+from .ml_engine import ml_engine
+from services.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Canonical encoding for key material: dict keys sorted at every level, so equal
+# contexts built in a different order produce the same key
+_KEY_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+class _SemanticScope:
+    """Semantic entries sharing one scope, oldest first.
+
+    Embeddings are rows ``start:start + len(self)`` of one float32 matrix, so a
+    lookup scores every entry with a single matrix-vector product. Rows are
+    appended at the end and dropped from the front; the live rows are moved back
+    to the top (doubling the matrix when it is over half full) once the end is reached.
+    """
+
+    __slots__ = ("matrix", "responses", "start")
+
+    def __init__(self, dim: int):
+        self.matrix = np.empty((8, dim), dtype=np.float32)
+        self.responses: Deque[Dict[str, Any]] = deque()
+        self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def append(self, embedding: np.ndarray, response: Dict[str, Any]) -> None:
+        count = len(self.responses)
+        end = self.start + count
+        if end == self.matrix.shape[0]:
+            rows = self.matrix.shape[0] * 2 if count * 2 > self.matrix.shape[0] else self.matrix.shape[0]
+            matrix = np.empty((rows, self.matrix.shape[1]), dtype=np.float32)
+            matrix[:count] = self.matrix[self.start:end]
+            self.matrix, self.start, end = matrix, 0, count
+        self.matrix[end] = embedding
+        self.responses.append(response)
+
+    def popleft(self) -> None:
+        self.responses.popleft()
+        self.start += 1
+
+    def best_match(self, embedding: np.ndarray) -> Tuple[float, Dict[str, Any]]:
+        """Highest cosine similarity and its response; embeddings are unit-normalized"""
+        scores = self.matrix[self.start:self.start + len(self.responses)] @ embedding
+        best = int(np.argmax(scores))
+        return float(scores[best]), self.responses[best]
+
+class ResponseCache:
+    """Two-tier (exact + semantic) cache for AI engine responses.
+
+    The exact tier lives in Redis and is keyed by a digest of the full request.
+    The semantic tier is kept in process and matches near-duplicate queries
+    asked with the same skill level, language and context. Its entries expire
+    with the same TTL as the exact tier, the oldest entry is evicted once
+    ``max_entries`` is exceeded, and queries shorter than ``min_tokens`` only
+    ever match exactly.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.AI_CACHE_TTL,
+        similarity_threshold: float = settings.AI_CACHE_SIMILARITY_THRESHOLD,
+        max_entries: int = settings.AI_CACHE_MAX_ENTRIES,
+        min_tokens: int = settings.AI_CACHE_MIN_TOKENS
+    ):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self.scopes: Dict[str, _SemanticScope] = {}
+        # (expires_at, scope digest) per semantic entry; a constant TTL keeps
+        # insertion order equal to expiry order across all scopes
+        self.expiry: Deque[Tuple[float, str]] = deque()
+
+    @staticmethod
+    def _scope_digest(context: Dict[str, Any], user_skill_level: str, language: str) -> str:
+        """Digest of everything except the query text"""
+        payload = orjson.dumps([user_skill_level, language, context], option=_KEY_OPTIONS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def make_key(self, query: str, context: Dict[str, Any], user_skill_level: str, language: str) -> str:
+        """Build the exact-match cache key"""
+        payload = orjson.dumps([query, user_skill_level, language, context], option=_KEY_OPTIONS, default=str)
+        return "ai_response:" + hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    async def get(
+        self,
+        query: str,
+        context: Dict[str, Any],
+        user_skill_level: str,
+        language: str
+    ) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, exact match first then semantic match"""
+        try:
+            cached = await redis_client.cache_get(self.make_key(query, context, user_skill_level, language))
+            if isinstance(cached, dict):
+                return cached
+
+            if len(query.split()) < self.min_tokens:
+                return None
+            self._expire(time.monotonic())
+            scope = self.scopes.get(self._scope_digest(context, user_skill_level, language))
+            if not scope:
+                return None
+
+            best_score, best_response = scope.best_match(ml_engine.embed(query))
+            if best_score > self.similarity_threshold:
+                logger.debug(f"Semantic cache hit (similarity={best_score:.3f})")
+                return best_response
+            return None
+
+        except Exception as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+
+    async def set(
+        self,
+        query: str,
+        context: Dict[str, Any],
+        user_skill_level: str,
+        language: str,
+        response: Dict[str, Any]
+    ) -> None:
+        """Store a response in both cache tiers"""
+        try:
+            await redis_client.cache_set(
+                self.make_key(query, context, user_skill_level, language),
+                response,
+                expire=self.ttl
+            )
+
+            if len(query.split()) < self.min_tokens:
+                return
+            now = time.monotonic()
+            self._expire(now)
+            embedding = ml_engine.embed(query)
+            digest = self._scope_digest(context, user_skill_level, language)
+            scope = self.scopes.get(digest)
+            if scope is None:
+                scope = self.scopes[digest] = _SemanticScope(embedding.shape[0])
+            scope.append(embedding, response)
+            self.expiry.append((now + self.ttl, digest))
+
+            # Keep the semantic tier bounded by evicting the oldest entry
+            if len(self.expiry) > self.max_entries:
+                self._evict_oldest()
+
+        except Exception as e:
+            logger.error(f"Error writing response cache: {str(e)}")
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest semantic entry, and its scope once empty"""
+        _, digest = self.expiry.popleft()
+        scope = self.scopes[digest]
+        scope.popleft()
+        if not scope:
+            del self.scopes[digest]
+
+    def _expire(self, now: float) -> None:
+        """Drop semantic entries whose TTL has passed"""
+        while self.expiry and self.expiry[0][0] <= now:
+            self._evict_oldest()
+
+response_cache = ResponseCache()
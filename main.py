@@ -1,10 +1,29 @@
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+import sys
+from contextlib import asynccontextmanager
+
+# Use the libuv-based event loop when available (ships with uvicorn[standard])
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
+from brotli_asgi import BrotliMiddleware
+import brotli
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import ORJSONResponse, Response
+import orjson
+from pymongo.errors import ConnectionFailure, WaitQueueTimeoutError
 from core.config import get_settings
-from core.database import Database
+from core.database import Database, init_db, close_db
+from core.ai_engine import shutdown_ai_engine
+from core.faq import faq_router
 from core.logging_config import configure_logging
+from services.redis import redis_client
 from api.routes import router as api_router
 
 # Configure logging
@@ -14,6 +33,51 @@ logger = logging.getLogger(__name__)
 # Get settings
 settings = get_settings()
 
+async def _start_database():
+    """Connect to MongoDB, then load the FAQ table that depends on it"""
+    await init_db()
+    await faq_router.load(Database.get_db())
+
+async def _start_redis():
+    """Connect to Redis; the app degrades to in-process caching without it"""
+    try:
+        await redis_client.connect()
+        logger.info("✅ Connected to Redis")
+    except Exception as e:
+        logger.warning("⚠️ Redis unavailable, AI response cache will be in-process only: %s", str(e))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services before serving and clean them up on shutdown"""
+    try:
+        logger.info("\n=== Starting AI Assistant API ===")
+        # Independent services connect concurrently, so startup takes the slowest, not the sum
+        await asyncio.gather(_start_database(), _start_redis())
+        # Build and serialize the OpenAPI schema once instead of on the first docs request
+        app.state.openapi_json = orjson.dumps(app.openapi())
+        app.state.openapi_json_br = brotli.compress(app.state.openapi_json, quality=11)
+        logger.info("✅ CORS enabled for origins: %s", settings.CORS_ORIGINS)
+        logger.info("=== Startup Complete ===\n")
+    except Exception as e:
+        logger.error("❌ Startup Error: %s", str(e))
+        raise
+
+    yield
+
+    # Every service gets closed even if another one fails to
+    shutdowns = [close_db(), redis_client.close(), shutdown_ai_engine()]
+    # The NLP engine pulls in optional heavy dependencies, so only flush it if something loaded it
+    nlp_engine = sys.modules.get("core.nlp_engine")
+    if nlp_engine is not None:
+        shutdowns.append(nlp_engine.shutdown_nlp_engine())
+    results = await asyncio.gather(*shutdowns, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors:
+        logger.error("❌ Shutdown Error: %s", str(error))
+    if errors:
+        raise errors[0]
+    logger.info("=== Shutdown Complete ===")
+
 # Create FastAPI app with metadata
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -28,48 +92,38 @@ app = FastAPI(
     * Admin dashboard metrics
     """,
     version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    # Served below from the schema serialized at startup
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+# Add CORS middleware; Starlette checks each request's origin with `in`, which is a
+# hash lookup on a frozenset rather than a scan of the configured list
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
+    allow_origins=frozenset(settings.CORS_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Add Gzip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Brotli at a low quality level is cheaper than gzip for a better ratio; small bodies
+# aren't worth the framing overhead, and clients without br support still get gzip.
+# SSE is excluded: the gzip fallback buffers chunks and would hold back streamed tokens
+app.add_middleware(
+    BrotliMiddleware,
+    quality=4,
+    minimum_size=4096,
+    gzip_fallback=True,
+    excluded_handlers=[r"/chat/analyze/stream$"]
+)
 
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    try:
-        logger.info("\n=== Starting AI Assistant API ===")
-        await Database.initialize()
-        logger.info("✅ CORS enabled for origins: %s", settings.CORS_ORIGINS)
-        logger.info("=== Startup Complete ===\n")
-    except Exception as e:
-        logger.error("❌ Startup Error: %s", str(e))
-        raise
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    try:
-        await Database.close()
-        logger.info("=== Shutdown Complete ===")
-    except Exception as e:
-        logger.error("❌ Shutdown Error: %s", str(e))
-        raise
-
 @app.get("/")
 async def root():
     """Root endpoint returning API status"""
@@ -82,11 +136,70 @@ async def root():
         "redoc": "/redoc"
     }
 
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json(request: Request):
+    # Already-encoded responses pass through the compression middleware untouched
+    if "br" in request.headers.get("accept-encoding", ""):
+        return Response(
+            app.state.openapi_json_br,
+            media_type="application/json",
+            headers={"Content-Encoding": "br", "Vary": "Accept-Encoding"}
+        )
+    return Response(app.state.openapi_json, media_type="application/json")
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_docs():
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{settings.PROJECT_NAME} - Swagger UI")
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_docs():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{settings.PROJECT_NAME} - ReDoc")
+
+@app.get("/healthz")
+async def healthz():
+    """Health check that round-trips to MongoDB"""
+    try:
+        info = await Database.server_info()
+        return {
+            "status": "ok",
+            "mongodb": info.get("version"),
+            "pool_saturated_count": Database.pool_listener.saturated_count
+        }
+    except Exception as e:
+        logger.error(f"Health check failed: {str(e)}")
+        return ORJSONResponse(status_code=503, content={"status": "unavailable"})
+
+# A full connection pool is an overload, not a server error
+@app.exception_handler(WaitQueueTimeoutError)
+async def pool_saturated_handler(request, exc):
+    logger.error(f"Database pool saturated: {str(exc)}")
+    return ORJSONResponse(status_code=503, content={"detail": "Database busy, please retry"})
+
+# Lost connectivity that escapes a route also counts towards opening the MongoDB circuit
+# breaker; failed driver heartbeats feed it even when routes handle the error themselves
+@app.exception_handler(ConnectionFailure)
+async def database_unavailable_handler(request, exc):
+    Database.breaker.record_failure()
+    logger.error(f"Database unavailable: {str(exc)}")
+    return ORJSONResponse(status_code=503, content={"detail": "Database unavailable"})
+
 # Error handler for generic exceptions
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {str(exc)}")
-    return HTTPException(
-        status_code=500,
-        detail="Internal server error"
-    )
\ No newline at end of file
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # No reload here: the file watcher would run in every worker
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        log_level="info"
+    )
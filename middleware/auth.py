@@ -1,9 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jwt import PyJWTError
 from core.config import settings
 from models.user import UserInDB
-from core.database import get_db_dependency
+from core.database import get_db
 from core.auth import decode_token
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
@@ -13,7 +13,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ) -> UserInDB:
     """Verify JWT token and return user."""
     try:
@@ -63,7 +63,7 @@ async def get_current_user(
                 detail="Error processing user data"
             )
             
-    except JWTError as e:
+    except PyJWTError as e:
         logger.error(f"JWT validation error: {str(e)}")
         raise credentials_exception
     except Exception as e:
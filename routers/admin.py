@@ -3,9 +3,9 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from middleware.auth import get_current_admin
 from models.user import UserInDB, UserUpdate
-from core.database import get_db_dependency
+from core.database import get_db_bounded
 # from ..core.auth import get_current_admin_user
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 
 @router.get("/metrics")
 async def get_metrics(
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency), 
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded), 
     _: UserInDB = Depends(get_current_admin)
 ) -> Dict:
     """Get admin metrics"""
@@ -43,10 +43,12 @@ async def get_metrics(
         raise HTTPException(status_code=500, detail="Failed to get metrics")
 
 @router.get("/users", response_model=List[UserInDB])
-async def get_users(_: UserInDB = Depends(get_current_admin)):
+async def get_users(
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded),
+    _: UserInDB = Depends(get_current_admin)
+):
     """Get all users in the system"""
     try:
-        db = await get_db_dependency()
         users = await db.users.find({}).to_list(None)
         return users
     except Exception as e:
@@ -68,7 +70,7 @@ async def get_roles(_: UserInDB = Depends(get_current_admin)):
 
 @router.get("/logs")
 async def get_logs(limit: int = 100, 
-                  db: AsyncIOMotorClient = Depends(get_db_dependency),
+                  db: AsyncIOMotorDatabase = Depends(get_db_bounded),
                   _: UserInDB = Depends(get_current_admin)) -> List[Dict]:
     """Get system logs"""
     try:
@@ -88,7 +90,7 @@ async def get_logs(limit: int = 100,
 
 @router.post("/log")
 async def add_log(level: str, message: str,
-                 db: AsyncIOMotorClient = Depends(get_db_dependency),
+                 db: AsyncIOMotorDatabase = Depends(get_db_bounded),
                  _: UserInDB = Depends(get_current_admin)):
     try:
         await db.system_logs.insert_one({
@@ -105,11 +107,11 @@ async def add_log(level: str, message: str,
 async def update_user(
     user_id: str,
     user_update: UserUpdate,
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded),
     current_admin: UserInDB = Depends(get_current_admin)
 ):
     """Update user details"""
     try:
-        db = await get_db_dependency()
         result = await db.users.update_one(
             {"_id": user_id},
             {"$set": user_update.model_dump(exclude_unset=True)}
@@ -124,11 +126,11 @@ async def update_user(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded),
     current_admin: UserInDB = Depends(get_current_admin)
 ):
     """Delete a user"""
     try:
-        db = await get_db_dependency()
         result = await db.users.delete_one({"_id": user_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
@@ -2,45 +2,26 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from core.config import get_settings
 from models.user import UserCreate, UserResponse, UserInDB
 from models.auth import AuthResponse
 from core.auth import verify_password, get_password_hash, create_access_token
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from core.database import get_db_dependency
+from core.database import get_db
 import logging
 from bson import ObjectId
 from middleware.auth import get_current_active_user
-from services.mongodb import get_mongodb
+from services.mongodb import mongodb_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["auth"])
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
-
 @router.post("/token", response_model=AuthResponse)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Login user and return access token"""
     try:
@@ -62,7 +43,7 @@ async def login(
         user = UserInDB(**user_dict)
 
         # Verify password
-        if not verify_password(form_data.password, user.password):
+        if not await verify_password(form_data.password, user.password):
             logger.warning(f"Login failed: Invalid password - {email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -112,7 +93,7 @@ async def login(
 
 @router.post("/register", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
-    db = get_mongodb()
+    db = mongodb_service
     
     # Check if user already exists
     existing_user = await db.find_one("users", {"$or": [
@@ -127,7 +108,7 @@ async def register(user_data: UserCreate):
     
     # Create user document
     user_dict = user_data.model_dump(exclude={"password"})
-    user_dict["hashed_password"] = get_password_hash(user_data.password)
+    user_dict["hashed_password"] = await get_password_hash(user_data.password)
     user_dict["created_at"] = datetime.utcnow()
     user_dict["role"] = "user"
     user_dict["preferences"] = {}
@@ -148,7 +129,7 @@ async def register(user_data: UserCreate):
     )
     
     # Get created user for response
-    created_user = await db.find_one("users", {"_id": result})
+    created_user = await db.find_one("users", {"_id": ObjectId(result)})
     if not created_user:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -164,13 +145,13 @@ async def register(user_data: UserCreate):
 
 @router.post("/admin/login", response_model=Dict[str, Any])
 async def admin_login(form_data: OAuth2PasswordRequestForm = Depends()):
-    db = get_mongodb()
+    db = mongodb_service
     user = await db.find_one("users", {
         "email": form_data.username,
         "role": "admin"
     })
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await verify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -198,7 +179,7 @@ async def admin_login(form_data: OAuth2PasswordRequestForm = Depends()):
 @router.get("/verify", response_model=UserResponse, summary="Verify current token")
 async def verify_token(
     current_user: UserInDB = Depends(get_current_active_user),
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Verify the current token and return user info
@@ -225,7 +206,7 @@ async def verify_token(
 @router.get("/me", response_model=UserResponse, summary="Get current user info")
 async def read_users_me(
     current_user: UserInDB = Depends(get_current_active_user),
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get current user information."""
     try:
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Dict, Any
-from core.database import get_database, get_db_dependency
+from core.database import get_db_bounded
+from services.mongodb import mongodb_service
 from bson import ObjectId
 import logging
 from models.category import CategoryResponse, CategoryInDB, CategoryStats
@@ -12,7 +13,7 @@ router = APIRouter(tags=["categories"])
 @router.get("", response_model=List[CategoryResponse])
 async def get_categories(
     active_only: bool = True,
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded)
 ) -> List[CategoryResponse]:
     """Get all categories"""
     try:
@@ -34,7 +35,7 @@ async def get_category(category_id: str) -> CategoryResponse:
         if not ObjectId.is_valid(category_id):
             raise HTTPException(status_code=400, detail="Invalid category ID format")
         
-        db = await get_database()
+        db = mongodb_service
         category = await db.find_one("categories", {"_id": ObjectId(category_id)})
         
         if not category:
@@ -54,7 +55,7 @@ async def get_category_stats(category_id: str) -> CategoryStats:
         if not ObjectId.is_valid(category_id):
             raise HTTPException(status_code=400, detail="Invalid category ID format")
         
-        db = await get_database()
+        db = mongodb_service
         category = await db.find_one("categories", {"_id": ObjectId(category_id)})
         
         if not category:
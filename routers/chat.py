@@ -1,16 +1,19 @@
 from fastapi import APIRouter, WebSocket, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from models.message import MessageCreate, Message
 from services.ai_service import ai_service
-from core.database import get_db_dependency
+from core.database import get_db
 from middleware.auth import get_current_user, get_current_active_user
 from models.user import UserInDB
 from core.ml_engine import ml_engine
+from core.ai_engine import AIEngine, get_ai_engine
 from bson import ObjectId
 import logging
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+import orjson
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["chat"])
@@ -30,7 +33,7 @@ class ChatAnalyzeResponse(BaseModel):
 async def analyze_chat(
     message: ChatAnalyzeRequest,
     current_user: UserInDB = Depends(get_current_active_user),
-    db = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Analyze a chat message using AI"""
     try:
@@ -95,12 +98,51 @@ async def analyze_chat(
             detail="Internal server error"
         )
 
+@router.post("/analyze/stream")
+async def analyze_chat_stream(
+    message: ChatAnalyzeRequest,
+    current_user: UserInDB = Depends(get_current_active_user),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    ai_engine: AIEngine = Depends(get_ai_engine)
+):
+    """Analyze a chat message and stream the AI response as Server-Sent Events"""
+    logger.info(f"Streaming analysis for user {current_user.email} in category {message.category}")
+
+    await db.messages.insert_one({
+        "user_id": str(current_user.id),
+        "content": message.content,
+        "category": message.category,
+        "type": "user",
+        "created_at": datetime.utcnow(),
+        "status": "sent"
+    })
+
+    async def event_stream():
+        async for event in ai_engine.stream_solution(message.content, {"category": message.category}):
+            if event["type"] == "done":
+                try:
+                    result = await db.messages.insert_one({
+                        "user_id": str(current_user.id),
+                        "content": event["solution"].get("response", ""),
+                        "category": message.category,
+                        "type": "assistant",
+                        "confidence": event["confidence_score"],
+                        "created_at": datetime.utcnow(),
+                        "status": "completed"
+                    })
+                    event["id"] = str(result.inserted_id)
+                except Exception as e:
+                    logger.error(f"Database error storing streamed AI response: {str(e)}")
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/{message_id}/feedback")
 async def submit_feedback(
     message_id: str,
     feedback: Dict[str, Any],
     current_user: UserInDB = Depends(get_current_active_user),
-    db = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Submit feedback for a chat message"""
     try:
@@ -129,7 +171,7 @@ async def submit_feedback(
 async def get_user_history(
     user_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
-    db = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ) -> List[Message]:
     """Get chat history for a user"""
     try:
@@ -165,7 +207,7 @@ async def get_category_stats(category: Optional[str]) -> dict:
         if not category:
             return {}
 
-        db = await get_db_dependency()
+        db = await get_db()
         stats = await db.category_stats.find_one({"category": category})
         return stats or {}
     except Exception:
@@ -173,7 +215,7 @@ async def get_category_stats(category: Optional[str]) -> dict:
 
 async def update_message_status(message_id: str, status: str, data: dict):
     try:
-        db = await get_db_dependency()
+        db = await get_db()
         await db.messages.update_one(
             {"_id": ObjectId(message_id)},
             {"$set": {
@@ -4,7 +4,7 @@ from models.feedback import FeedbackCreate, Feedback
 from models.user import UserInDB
 from middleware.auth import get_current_active_user
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from core.database import get_db_dependency
+from core.database import get_db_bounded
 from datetime import datetime
 import logging
 
@@ -15,7 +15,7 @@ router = APIRouter(tags=["feedback"])
 async def submit_feedback(
     feedback: FeedbackCreate,
     current_user: UserInDB = Depends(get_current_active_user),
-    db: AsyncIOMotorDatabase = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded)
 ):
     """Submit user feedback for a message"""
     try:
@@ -39,7 +39,7 @@ async def submit_feedback(
 @router.get("/stats")
 async def get_feedback_stats(
     current_user: UserInDB = Depends(get_current_active_user),
-    db = Depends(get_db_dependency)
+    db: AsyncIOMotorDatabase = Depends(get_db_bounded)
 ) -> Dict:
     """Get feedback statistics"""
     try:
@@ -10,6 +10,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.config import get_settings
+from core.database import create_indexes
 from datetime import datetime
 
 # Configure logging
@@ -76,48 +77,20 @@ async def init_db():
         # Clean up invalid usernames first
         await cleanup_usernames(db)
 
-        # Drop existing indexes to avoid conflicts
-        try:
-            await db.users.drop_indexes()
-            await db.messages.drop_indexes()
-            await db.categories.drop_indexes()
-            logger.info("Dropped existing indexes")
-        except Exception as e:
-            logger.warning(f"Error dropping indexes: {e}")
-
-        # Create indexes
-        # Users collection indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("username", unique=True)
-        await db.users.create_index([("role", 1), ("is_active", 1)])
-        logger.info("Created indexes for users collection")
-
-        # Messages collection indexes
-        await db.messages.create_index([("user_id", 1), ("created_at", -1)])
-        await db.messages.create_index([("category", 1), ("created_at", -1)])
-        logger.info("Created indexes for messages collection")
-
-        # Categories collection indexes
-        await db.categories.create_index("name", unique=True)
-        await db.categories.create_index("active")
-        logger.info("Created indexes for categories collection")
-
-        # Feedback collection indexes
-        await db.feedback.create_index([("message_id", 1), ("created_at", -1)])
-        await db.feedback.create_index([("user_id", 1), ("created_at", -1)])
-        logger.info("Created indexes for feedback collection")
+        # Create missing indexes; existing ones are left in place instead of being rebuilt
+        await create_indexes(db)
+        logger.info("Indexes are up to date")
 
         # Create default admin user if not exists
         admin_user = await db.users.find_one({"email": "admin@example.com"})
         if not admin_user:
-            from passlib.context import CryptContext
-            pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+            from core.auth import get_password_hash
             
             admin_doc = {
                 "email": "admin@example.com",
                 "username": "admin",
                 "full_name": "System Admin",
-                "hashed_password": pwd_context.hash("admin123"),
+                "hashed_password": await get_password_hash("admin123"),
                 "role": "admin",
                 "is_active": True,
                 "created_at": datetime.utcnow(),
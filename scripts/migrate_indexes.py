@@ -0,0 +1,38 @@
+import os
+import sys
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import get_settings
+from core.database import cleanup_null_usernames, create_indexes
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+async def migrate_indexes():
+    """Build the application's indexes; run before deploying a new release."""
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.get_mongodb_url())
+    db = client[settings.MONGODB_DB_NAME]
+    logger.info(f"Connected to MongoDB database: {settings.MONGODB_DB_NAME}")
+
+    try:
+        # Several null usernames would make the unique username index build fail
+        await cleanup_null_usernames(db)
+        # The only place allowed to drop and rebuild indexes whose definition changed
+        await create_indexes(db, rebuild_changed=True)
+        logger.info("Index migration completed successfully")
+    finally:
+        client.close()
+        logger.info("Database connection closed")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_indexes())
@@ -1,91 +1,32 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from typing import Optional, List, Dict, Any, Tuple, TypeVar, cast, Union
 from datetime import datetime
 import logging
-from core.config import settings, get_settings
+from core.database import Database
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=Dict[str, Any])
 
-class MongoDB:
-    def __init__(self):
-        self.client = None
-        self.db = None
-
-    async def connect(self):
-        self.client = AsyncIOMotorClient(settings.MONGODB_URL)
-        self.db = self.client[settings.MONGODB_DB_NAME]
-        # Create indexes
-        await self.create_indexes()
-        
-    async def close(self):
-        if self.client:
-            self.client.close()
-            
-    async def create_indexes(self):
-        # Create unique index on email for users collection
-        await self.db.users.create_index("email", unique=True)
-
-mongodb = MongoDB()
-
-async def get_mongodb():
-    return mongodb
-
 class MongoDBService:
+    """Collection helpers on top of the shared connection managed by core.database.Database"""
     _instance = None
-    client: Optional[AsyncIOMotorClient] = None
-    db: Optional[AsyncIOMotorDatabase] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    async def connect(self) -> None:
-        """Connect to MongoDB database"""
-        if not self.client:
-            try:
-                settings = get_settings()
-                self.client = AsyncIOMotorClient(settings.MONGODB_URL)
-                self.db = self.client[settings.MONGODB_DB_NAME]
-                # Test connection
-                await self.db.command('ping')
-                logger.info(f"Connected to MongoDB: {settings.MONGODB_DB_NAME}")
-            except Exception as e:
-                logger.error(f"MongoDB connection error: {str(e)}")
-                raise
-
-    async def close(self) -> None:
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
-            self.client = None
-            self.db = None
-            logger.info("Closed MongoDB connection")
+    @property
+    def db(self) -> Optional[AsyncIOMotorDatabase]:
+        return Database.db
 
     def _check_connection(self):
         """Check if database connection is initialized"""
-        if not self.db:
+        if self.db is None:
             raise RuntimeError("Database connection not initialized")
 
-    async def create_indexes(self) -> None:
-        """Create database indexes"""
-        try:
-            self._check_connection()
-            # Users collection indexes
-            await self.db.users.create_index("email", unique=True)
-            await self.db.users.create_index("username", unique=True)
-            # Messages collection indexes
-            await self.db.messages.create_index([("user_id", 1), ("created_at", -1)])
-            # Categories collection indexes
-            await self.db.categories.create_index("name", unique=True)
-            logger.info("Created database indexes")
-        except Exception as e:
-            logger.error(f"Error creating indexes: {str(e)}")
-            raise
-
     async def find_one(self, collection: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Find a single document"""
         try:
@@ -1,7 +1,7 @@
 from redis.asyncio import Redis
 from typing import Optional, Any, Union
 import json
-from ..core.config import settings
+from core.config import settings
 
 class RedisService:
     def __init__(self):